@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import AcademicYear, Class, Subject, ClassSubject, Activity, Timetable, SchoolInfo, GalleryImage
+from .models import (
+    AcademicYear, BellSchedule, CalendarFeedToken, Class, Subject, ClassSubject, Activity, Period, Timetable,
+    SchoolInfo, GalleryImage,
+)
 
 
 def _reset_broken_transaction():
@@ -31,6 +34,22 @@ class AcademicYearAdmin(admin.ModelAdmin):
     list_filter = ['is_current']
     list_editable = ['is_current']
 
+class PeriodInline(admin.TabularInline):
+    model = Period
+    extra = 1
+
+
+@admin.register(BellSchedule)
+class BellScheduleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'academic_year']
+    inlines = [PeriodInline]
+
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ['user', 'created_at']
+    search_fields = ['user__username', 'user__first_name', 'user__last_name']
+    readonly_fields = ['token', 'created_at']
+
 @admin.register(SchoolInfo)
 class SchoolInfoAdmin(admin.ModelAdmin):
     # Only allow one instance
@@ -57,7 +76,7 @@ class SubjectAdmin(admin.ModelAdmin):
 
 @admin.register(ClassSubject)
 class ClassSubjectAdmin(admin.ModelAdmin):
-    list_display = ['class_name', 'subject', 'teacher']
+    list_display = ['class_name', 'subject', 'teacher', 'periods_per_week']
     list_filter = ['class_name', 'subject']
 
 
@@ -1,8 +1,8 @@
-from .models import SchoolInfo
+from .utils import get_school_info
 
 def school_info(request):
     try:
-        info = SchoolInfo.objects.first()
+        info = get_school_info(request)
     except:
         info = None
         
@@ -0,0 +1,205 @@
+"""
+iCalendar (.ics) schedule feeds.
+
+Teachers and students subscribe their phone calendar to
+``calendar/<token>.ics``; the token stands in for a login, so calendar
+apps can poll without a session. A feed holds:
+
+* each lesson as one VEVENT repeating weekly until the end of its
+  academic year (RRULE), rather than one event per week;
+* the teacher's duty weeks as all-day events;
+* active school activities as all-day events.
+
+Calendar apps poll often, so the body and its ETag are cached per user.
+The key carries the timetable version (``academics.timetabling``) and a
+calendar version that ``academics.signals`` bumps when activities, duty
+rosters or academic years change. The versions live in the shared cache
+(see CACHES in settings), so every worker retires a feed at the same time.
+A poll that sends a matching If-None-Match gets a 304 from a token lookup
+and a cache hit.
+
+Lesson times are written in UTC, which every calendar app reads without a
+VTIMEZONE block.
+"""
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from academics.models import Activity, CalendarFeedToken, Timetable
+from academics.timetabling import timetable_version
+from academics.utils import bump_cache_version, get_cache_version, get_school_info
+from teachers.models import DutyAssignment
+
+CALENDAR_VERSION_KEY = 'academics:calendar_version'
+# Feeds are keyed by the timetable and calendar versions, so edits retire
+# them straight away on every worker; the timeout only bounds staleness
+# after changes no signal covers (e.g. a teacher renaming themselves).
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# How long calendar apps and proxies may reuse a feed before asking again
+FEED_MAX_AGE = 60 * 15
+
+UID_DOMAIN = 'school-system'
+
+
+def calendar_version():
+    return get_cache_version(CALENDAR_VERSION_KEY)
+
+
+def bump_calendar_version():
+    bump_cache_version(CALENDAR_VERSION_KEY)
+
+
+def feed_token_for(user):
+    return CalendarFeedToken.objects.get_or_create(user=user)[0]
+
+
+def feed_urls(request, user):
+    """``{'https': ..., 'webcal': ...}`` subscription links for ``user``'s feed."""
+    url = request.build_absolute_uri(reverse('academics:calendar_feed', args=[feed_token_for(user).token]))
+    return {'https': url, 'webcal': 'webcal://' + url.split('://', 1)[1]}
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces as RFC 5545 requires."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Do not split a multi-byte character
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(name, day, at):
+    """``NAME:...Z`` property for school-local ``at`` on ``day``, written in UTC."""
+    return f"{name}:{_utc(timezone.make_aware(datetime.combine(day, at)))}"
+
+
+def _all_day(start, end):
+    """DTSTART/DTEND lines for all-day events from ``start`` to ``end`` inclusive."""
+    return [
+        f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(end + timedelta(days=1)).strftime('%Y%m%d')}",
+    ]
+
+
+def _lessons(user):
+    lessons = Timetable.objects.select_related(
+        'class_subject__subject', 'class_subject__class_name__academic_year', 'class_subject__teacher__user',
+    )
+    if user.user_type == 'teacher':
+        return lessons.filter(
+            class_subject__teacher__user=user, class_subject__class_name__academic_year__is_current=True,
+        )
+    student = getattr(user, 'student', None) if user.user_type == 'student' else None
+    if student and student.current_class_id:
+        return lessons.filter(class_subject__class_name_id=student.current_class_id)
+    return lessons.none()
+
+
+def _lesson_event(lesson, user, stamp):
+    cs = lesson.class_subject
+    year = cs.class_name.academic_year
+    first = year.start_date + timedelta(days=(lesson.day - year.start_date.weekday()) % 7)
+    until = timezone.make_aware(datetime.combine(year.end_date, time.max.replace(microsecond=0)))
+    if user.user_type == 'teacher':
+        summary = f"{cs.subject.name} - {cs.class_name.name}"
+    else:
+        summary = cs.subject.name
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:timetable-{lesson.id}@{UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        _local('DTSTART', first, lesson.start_time),
+        _local('DTEND', first, lesson.end_time),
+        f"RRULE:FREQ=WEEKLY;UNTIL={_utc(until)}",
+        f"SUMMARY:{_escape(summary)}",
+    ]
+    if lesson.room:
+        lines.append(f"LOCATION:{_escape(lesson.room)}")
+    if cs.teacher and user.user_type != 'teacher':
+        lines.append(f"DESCRIPTION:{_escape('Teacher: ' + cs.teacher.user.get_full_name())}")
+    lines.append('END:VEVENT')
+    return lines
+
+
+def build_feed(user):
+    """Render ``user``'s schedule as an iCalendar document."""
+    stamp = _utc(timezone.now())
+    school_info = get_school_info()
+    school_name = school_info.name if school_info else 'School'
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f"PRODID:-//{_escape(school_name)}//Schedule//EN",
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{_escape(f'{school_name} - {user.get_full_name() or user.username}')}",
+        f"X-WR-TIMEZONE:{settings.TIME_ZONE}",
+        f"X-PUBLISHED-TTL:PT{FEED_MAX_AGE // 60}M",
+    ]
+
+    for lesson in _lessons(user):
+        lines.extend(_lesson_event(lesson, user, stamp))
+
+    if user.user_type == 'teacher':
+        duties = DutyAssignment.objects.filter(
+            teacher__user=user, week__academic_year__is_current=True,
+        ).select_related('week')
+        for duty in duties:
+            lines += ['BEGIN:VEVENT', f"UID:duty-{duty.id}@{UID_DOMAIN}", f"DTSTAMP:{stamp}"]
+            lines += _all_day(duty.week.start_date, duty.week.end_date)
+            lines.append(f"SUMMARY:{_escape(f'Duty week {duty.week.week_number}: {duty.role}')}")
+            if duty.week.remarks:
+                lines.append(f"DESCRIPTION:{_escape(duty.week.remarks)}")
+            lines += ['TRANSP:TRANSPARENT', 'END:VEVENT']
+
+    for activity in Activity.objects.filter(is_active=True):
+        lines += ['BEGIN:VEVENT', f"UID:activity-{activity.id}@{UID_DOMAIN}", f"DTSTAMP:{stamp}"]
+        lines += _all_day(activity.date, activity.date)
+        lines.append(f"SUMMARY:{_escape(activity.title)}")
+        if activity.summary:
+            lines.append(f"DESCRIPTION:{_escape(activity.summary)}")
+        if activity.tag:
+            lines.append(f"CATEGORIES:{_escape(activity.tag)}")
+        lines += ['TRANSP:TRANSPARENT', 'END:VEVENT']
+
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def get_feed(user):
+    """``(body, etag)`` for ``user``'s feed, cached until the schedule changes."""
+    scope = ''
+    if user.user_type == 'student':
+        student = getattr(user, 'student', None)
+        # A student moving class changes their lessons without a timetable edit
+        scope = student.current_class_id if student else ''
+    cache_key = f'academics:ical:{user.pk}:{scope}:{timetable_version()}:{calendar_version()}'
+    feed = cache.get(cache_key)
+    if feed is None:
+        body = build_feed(user)
+        feed = (body, '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest())
+        cache.set(cache_key, feed, FEED_CACHE_TIMEOUT)
+    return feed
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_resource_curriculum_and_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsubject',
+            name='periods_per_week',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Lessons per week for the timetable generator; blank shares the week evenly', null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0 on 2026-10-18 06:40
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The bell times the timetable pages used to hardcode
+STANDARD_DAY = [
+    ("Cleaning / Assembly", (6, 0), (7, 0), False),
+    ("Lesson 1", (7, 0), (8, 40), True),
+    ("Lesson 2", (8, 40), (9, 50), True),
+    ("First Break", (9, 50), (10, 20), False),
+    ("Lesson 3", (10, 20), (11, 30), True),
+    ("Lesson 4", (11, 30), (12, 40), True),
+    ("Second Break", (12, 40), (13, 0), False),
+    ("Lesson 5", (13, 0), (14, 0), True),
+]
+
+
+def create_bell_schedules(apps, schema_editor):
+    AcademicYear = apps.get_model('academics', 'AcademicYear')
+    BellSchedule = apps.get_model('academics', 'BellSchedule')
+    Period = apps.get_model('academics', 'Period')
+    for year in AcademicYear.objects.filter(bell_schedule__isnull=True):
+        schedule = BellSchedule.objects.create(academic_year=year)
+        Period.objects.bulk_create([
+            Period(bell_schedule=schedule, name=name, start_time=datetime.time(*start),
+                   end_time=datetime.time(*end), is_lesson=is_lesson)
+            for name, start, end, is_lesson in STANDARD_DAY
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0012_classsubject_periods_per_week'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BellSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Standard Day', max_length=100)),
+                ('academic_year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bell_schedule', to='academics.academicyear')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Period',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('is_lesson', models.BooleanField(default=True, help_text='Untick for breaks, assembly and cleaning')),
+                ('bell_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periods', to='academics.bellschedule')),
+            ],
+            options={
+                'ordering': ['start_time'],
+                'unique_together': {('bell_schedule', 'start_time')},
+            },
+        ),
+        migrations.RunPython(create_bell_schedules, migrations.RunPython.noop),
+    ]
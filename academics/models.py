@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from accounts.models import User
 
@@ -48,6 +50,30 @@ class Class(models.Model):
         unique_together = ['name', 'academic_year']
 
 
+class BellSchedule(models.Model):
+    """The school day's periods for one academic year."""
+    academic_year = models.OneToOneField(AcademicYear, on_delete=models.CASCADE, related_name='bell_schedule')
+    name = models.CharField(max_length=100, default="Standard Day")
+
+    def __str__(self):
+        return f"{self.name} ({self.academic_year})"
+
+
+class Period(models.Model):
+    bell_schedule = models.ForeignKey(BellSchedule, on_delete=models.CASCADE, related_name='periods')
+    name = models.CharField(max_length=50)  # e.g., "Lesson 1", "First Break"
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    is_lesson = models.BooleanField(default=True, help_text="Untick for breaks, assembly and cleaning")
+
+    def __str__(self):
+        return f"{self.name} ({self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')})"
+
+    class Meta:
+        ordering = ['start_time']
+        unique_together = ['bell_schedule', 'start_time']
+
+
 class Activity(models.Model):
     title = models.CharField(max_length=120)
     summary = models.TextField(blank=True)
@@ -79,6 +105,10 @@ class ClassSubject(models.Model):
     class_name = models.ForeignKey(Class, on_delete=models.CASCADE)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     teacher = models.ForeignKey('teachers.Teacher', on_delete=models.SET_NULL, null=True)
+    periods_per_week = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        help_text="Lessons per week for the timetable generator; blank shares the week evenly",
+    )
     
     def __str__(self):
         return f"{self.class_name} - {self.subject}"
@@ -173,3 +203,22 @@ class Resource(models.Model):
         
     class Meta:
         ordering = ['-uploaded_at']
+
+
+def generate_feed_token():
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeedToken(models.Model):
+    """Secret that lets a calendar app fetch one user's .ics schedule without logging in."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed_token')
+    token = models.CharField(max_length=64, unique=True, default=generate_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def regenerate(self):
+        """Replace the token, cutting off every calendar subscribed with the old link."""
+        self.token = generate_feed_token()
+        self.save(update_fields=['token'])
+
+    def __str__(self):
+        return f"Calendar feed for {self.user}"
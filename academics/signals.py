@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from academics.feeds import bump_calendar_version
+from academics.models import (
+    AcademicYear, Activity, BellSchedule, Class, ClassSubject, Period, SchoolInfo, Subject, Timetable,
+)
+from academics.timetabling import bump_timetable_version
+from academics.utils import invalidate_school_info
+from teachers.models import DutyAssignment, DutyWeek
+
+
+@receiver(post_save, sender=SchoolInfo)
+@receiver(post_delete, sender=SchoolInfo)
+def school_info_changed(sender, instance, **kwargs):
+    """Drop the cached SchoolInfo so every page picks up the edit."""
+    transaction.on_commit(invalidate_school_info)
+
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+@receiver(post_save, sender=ClassSubject)
+@receiver(post_delete, sender=ClassSubject)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=BellSchedule)
+@receiver(post_delete, sender=BellSchedule)
+@receiver(post_save, sender=Period)
+@receiver(post_delete, sender=Period)
+def timetable_changed(sender, instance, **kwargs):
+    """Retire cached master timetables once the change is committed."""
+    transaction.on_commit(bump_timetable_version)
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+@receiver(post_save, sender=DutyWeek)
+@receiver(post_delete, sender=DutyWeek)
+@receiver(post_save, sender=DutyAssignment)
+@receiver(post_delete, sender=DutyAssignment)
+@receiver(post_save, sender=AcademicYear)
+@receiver(post_delete, sender=AcademicYear)
+def calendar_changed(sender, instance, **kwargs):
+    """Retire cached calendar feeds; lesson changes reach them via the timetable version."""
+    transaction.on_commit(bump_calendar_version)
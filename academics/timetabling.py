@@ -0,0 +1,590 @@
+"""
+Timetable generation.
+
+The week is a grid of (day, period) slots, taken from the academic
+year's BellSchedule by ``get_slot_grid`` (DEFAULT_PERIODS when a year has
+none); its break periods are shown but never timetabled. Every
+ClassSubject needs ``periods_per_week`` lessons in it, and three hard
+constraints apply:
+
+* a class has at most one lesson per slot;
+* a teacher teaches at most one lesson per slot, across all classes;
+* no more lessons share a slot than there are rooms.
+
+A soft rule says a subject appears at most once a day in a class.
+
+Busy slots are kept as integer bitmasks per class and per teacher, so
+checking which slots are free for a class subject is a couple of bitwise
+operations. The solver is a backtracking search:
+- it always places the class subject with the fewest free slots next
+  (minimum remaining values);
+- it tries the least-used days of that class first;
+- an attempt that has not finished after RESTART_NODES nodes starts over
+  with a fresh random order, which avoids the long dead ends a single
+  deep search can get stuck in;
+- after NODE_LIMIT nodes in all it retries with the once-a-day rule
+  relaxed.
+
+Rooms are handed out per slot afterwards, keeping each class in its own
+home room where possible. ``generate_timetable`` then replaces the
+affected classes' rows with one ``bulk_create`` in a single transaction.
+
+``OccupancyIndex`` holds the same bitmasks for lessons already in the
+timetable. The solver uses it for the rows it keeps, and the timetable
+editor uses it to reject teacher and room clashes before saving.
+
+``master_timetable`` pivots a whole year into a class x day x period
+matrix from one query. Its rendered page is cached under a version token
+that ``bump_timetable_version`` replaces whenever lessons change (via
+``academics.signals``, or directly after the bulk writes here).
+"""
+import datetime
+import random
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+
+from academics.models import Class, ClassSubject, Period, Timetable
+from academics.utils import bump_cache_version, get_cache_version
+
+GridPeriod = namedtuple('GridPeriod', 'name start_time end_time is_lesson')
+
+DEFAULT_DAYS = [0, 1, 2, 3, 4]  # Monday to Friday
+# Used for academic years without a BellSchedule
+DEFAULT_PERIODS = [
+    GridPeriod("Cleaning / Assembly", datetime.time(6, 0), datetime.time(7, 0), False),
+    GridPeriod("Lesson 1", datetime.time(7, 0), datetime.time(8, 40), True),
+    GridPeriod("Lesson 2", datetime.time(8, 40), datetime.time(9, 50), True),
+    GridPeriod("First Break", datetime.time(9, 50), datetime.time(10, 20), False),
+    GridPeriod("Lesson 3", datetime.time(10, 20), datetime.time(11, 30), True),
+    GridPeriod("Lesson 4", datetime.time(11, 30), datetime.time(12, 40), True),
+    GridPeriod("Second Break", datetime.time(12, 40), datetime.time(13, 0), False),
+    GridPeriod("Lesson 5", datetime.time(13, 0), datetime.time(14, 0), True),
+]
+DEFAULT_SLOTS = [(p.start_time, p.end_time) for p in DEFAULT_PERIODS if p.is_lesson]
+NODE_LIMIT = 200_000
+RESTART_NODES = 3_000
+
+TIMETABLE_VERSION_KEY = 'academics:timetable_version'
+# Cached pages are keyed by the version, so they never need deleting; the
+# timeout only bounds staleness after edits that bypass the ORM (e.g.
+# teacher name changes).
+MASTER_TIMETABLE_CACHE_TIMEOUT = 60 * 60
+
+Lesson = namedtuple('Lesson', 'class_subject_id class_id day start_time end_time room')
+
+
+class SlotGrid:
+    """The week's days and a day's periods; ``slots`` are the lesson periods' times."""
+
+    def __init__(self, periods=DEFAULT_PERIODS, days=DEFAULT_DAYS):
+        self.periods = list(periods)
+        self.days = list(days)
+        self.lessons = [p for p in self.periods if p.is_lesson]
+        self.slots = [(p.start_time, p.end_time) for p in self.lessons]
+
+    def day_names(self):
+        names = dict(Timetable.DAY_CHOICES)
+        return [names[day] for day in self.days]
+
+    def rows(self, entries):
+        """Lay Timetable ``entries`` out as ``[(day name, [(period, entry), ...]), ...]``.
+
+        Each entry is placed once by its (day, start time); break periods
+        and empty lessons get ``None``. Entries off the grid are left out.
+        """
+        lesson_index = {p.start_time: i for i, p in enumerate(self.periods) if p.is_lesson}
+        matrix = {day: [None] * len(self.periods) for day in self.days}
+        for entry in entries:
+            index = lesson_index.get(entry.start_time)
+            if entry.day in matrix and index is not None and matrix[entry.day][index] is None:
+                matrix[entry.day][index] = entry
+        return [
+            (name, list(zip(self.periods, matrix[day])))
+            for day, name in zip(self.days, self.day_names())
+        ]
+
+
+def get_slot_grid(academic_year=None):
+    """The slot grid for ``academic_year`` (default: the current one), in one query.
+
+    Years without a BellSchedule use DEFAULT_PERIODS.
+    """
+    periods = Period.objects.all()
+    if academic_year is None:
+        periods = periods.filter(bell_schedule__academic_year__is_current=True)
+    else:
+        periods = periods.filter(bell_schedule__academic_year=academic_year)
+    periods = list(periods.order_by('start_time'))
+    return SlotGrid(periods or DEFAULT_PERIODS)
+
+
+class TimetableError(Exception):
+    """The requested timetable cannot be built."""
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _overlaps(start, end, other_start, other_end):
+    return start < other_end and other_start < end
+
+
+def _room_key(room):
+    return ' '.join(room.split()).casefold()
+
+
+class OccupancyIndex:
+    """Busy slots per class, teacher and room, as bitmasks over the slot grid.
+
+    Bit ``day_index * len(slots) + period`` is set when a lesson overlaps
+    that slot. ``owners`` remembers which class holds each teacher/room bit
+    so clashes can be reported by name.
+    """
+
+    def __init__(self, days=DEFAULT_DAYS, slots=DEFAULT_SLOTS):
+        self.days = list(days)
+        self.slots = list(slots)
+        self.per_day = len(self.slots)
+        self.classes = defaultdict(int)
+        self.teachers = defaultdict(int)
+        self.rooms = defaultdict(int)
+        self.owners = {}
+
+    @classmethod
+    def load(cls, days=DEFAULT_DAYS, slots=DEFAULT_SLOTS, academic_year=None, exclude_classes=()):
+        """Index ``academic_year``'s Timetable rows on ``days`` in one query, skipping ``exclude_classes``."""
+        index = cls(days, slots)
+        rows = Timetable.objects.filter(day__in=index.days)
+        if academic_year is not None:
+            rows = rows.filter(class_subject__class_name__academic_year=academic_year)
+        rows = rows.exclude(
+            class_subject__class_name__in=exclude_classes
+        ).values_list(
+            'day', 'start_time', 'end_time', 'room',
+            'class_subject__class_name_id', 'class_subject__class_name__name', 'class_subject__teacher_id',
+        )
+        for day, start, end, room, class_id, class_name, teacher_id in rows:
+            index.add(day, start, end, class_id=class_id, teacher_id=teacher_id, room=room, label=class_name)
+        return index
+
+    def slot_mask(self, day, start, end):
+        """Bits of the grid slots that ``start``-``end`` on ``day`` overlaps."""
+        if day not in self.days:
+            return 0
+        base = self.days.index(day) * self.per_day
+        mask = 0
+        for period, (slot_start, slot_end) in enumerate(self.slots):
+            if _overlaps(start, end, slot_start, slot_end):
+                mask |= 1 << (base + period)
+        return mask
+
+    def slot_label(self, slot):
+        day, period = divmod(slot, self.per_day)
+        return f"{dict(Timetable.DAY_CHOICES)[self.days[day]]} {self.slots[period][0].strftime('%H:%M')}"
+
+    def add(self, day, start, end, class_id=None, teacher_id=None, room='', label=''):
+        """Mark a lesson's slots busy; return its slot mask."""
+        mask = self.slot_mask(day, start, end)
+        if class_id:
+            self.classes[class_id] |= mask
+        if teacher_id:
+            self.teachers[teacher_id] |= mask
+        if room:
+            self.rooms[_room_key(room)] |= mask
+        for slot in _bits(mask):
+            if teacher_id:
+                self.owners[('teacher', teacher_id, slot)] = label
+            if room:
+                self.owners[('room', _room_key(room), slot)] = label
+        return mask
+
+    def clashes(self, mask, teacher_id=None, room=''):
+        """``[(kind, slot, held_by), ...]`` for the busy bits ``mask`` would collide with."""
+        found = []
+        if teacher_id:
+            for slot in _bits(mask & self.teachers.get(teacher_id, 0)):
+                found.append(('teacher', slot, self.owners.get(('teacher', teacher_id, slot), '')))
+        if room:
+            key = _room_key(room)
+            for slot in _bits(mask & self.rooms.get(key, 0)):
+                found.append(('room', slot, self.owners.get(('room', key, slot), '')))
+        return found
+
+
+class _Problem:
+    def __init__(self, class_subjects, days, slots, rooms, fixed):
+        self.days = list(days)
+        self.slots = list(slots)
+        self.per_day = len(self.slots)
+        self.size = len(self.days) * self.per_day
+        self.full = (1 << self.size) - 1
+        self.day_masks = [((1 << self.per_day) - 1) << (d * self.per_day) for d in range(len(self.days))]
+        self.rooms = list(rooms)
+
+        self.class_subjects = list(class_subjects)
+        self.quota = self._quotas()
+
+        # Slots already taken by lessons this run does not replace
+        occupancy = OccupancyIndex(self.days, self.slots)
+        self.slot_load = [0] * self.size
+        self.fixed_rooms = defaultdict(set)
+        for lesson in fixed:
+            mask = occupancy.add(
+                lesson.day, lesson.start_time, lesson.end_time,
+                class_id=lesson.class_subject.class_name_id, teacher_id=lesson.class_subject.teacher_id,
+            )
+            # Only lessons held in one of our rooms use up room capacity
+            if lesson.room in self.rooms:
+                for slot in _bits(mask):
+                    self.fixed_rooms[slot].add(lesson.room)
+                    self.slot_load[slot] += 1
+        self.class_busy = occupancy.classes
+        self.teacher_busy = occupancy.teachers
+
+    def _quotas(self):
+        """Explicit ``periods_per_week``; the rest of each class's week is shared evenly.
+
+        An even share is capped at one lesson a day, so a class with only a
+        few subjects gets free periods rather than the same subject all day.
+        """
+        quota = {}
+        by_class = defaultdict(list)
+        for cs in self.class_subjects:
+            by_class[cs.class_name_id].append(cs)
+        for class_id, subjects in by_class.items():
+            explicit = sum(cs.periods_per_week for cs in subjects if cs.periods_per_week is not None)
+            flexible = sorted((cs for cs in subjects if cs.periods_per_week is None), key=lambda cs: cs.id)
+            spare = max(self.size - explicit, 0)
+            for index, cs in enumerate(flexible):
+                share = spare // len(flexible) + (1 if index < spare % len(flexible) else 0)
+                quota[cs.id] = min(share, len(self.days))
+            for cs in subjects:
+                if cs.periods_per_week is not None:
+                    quota[cs.id] = cs.periods_per_week
+        return quota
+
+    def check(self):
+        """Raise TimetableError for demands no arrangement can meet."""
+        problems = []
+        class_load = defaultdict(int)
+        teacher_load = defaultdict(int)
+        for cs in self.class_subjects:
+            class_load[cs.class_name] += self.quota[cs.id]
+            if cs.teacher_id:
+                teacher_load[cs.teacher] += self.quota[cs.id]
+        for class_obj, load in class_load.items():
+            free = self.size - bin(self.class_busy[class_obj.id]).count('1')
+            if load > free:
+                problems.append(f"{class_obj} needs {load} lessons but has {free} free slots")
+        for teacher, load in teacher_load.items():
+            free = self.size - bin(self.teacher_busy[teacher.id]).count('1')
+            if load > free:
+                problems.append(f"{teacher} would teach {load} lessons in {free} free slots")
+        if self.rooms:
+            capacity = len(self.rooms) * self.size - sum(self.slot_load)
+            if sum(class_load.values()) > capacity:
+                problems.append(f"{sum(class_load.values())} lessons do not fit in {len(self.rooms)} rooms")
+        if problems:
+            raise TimetableError('; '.join(problems))
+
+    def solve(self, rng, spread, node_limit):
+        """Return ``{class_subject_id: [slot, ...]}`` or None if the budget runs out."""
+        class_busy = dict(self.class_busy)
+        teacher_busy = dict(self.teacher_busy)
+        load = list(self.slot_load)
+        capacity = len(self.rooms) or None
+        # Slots whose rooms are all taken, kept up to date by place()
+        at_capacity = [0]
+        if capacity is not None:
+            for slot, count in enumerate(load):
+                if count >= capacity:
+                    at_capacity[0] |= 1 << slot
+        used_days = defaultdict(int)   # cs id -> mask of days already holding it
+        remaining = {cs.id: self.quota[cs.id] for cs in self.class_subjects if self.quota[cs.id]}
+        info = {cs.id: (cs.class_name_id, cs.teacher_id) for cs in self.class_subjects}
+        placed = defaultdict(list)
+        tiebreak = {cs_id: rng.random() for cs_id in remaining}
+
+        def free_slots(cs_id):
+            class_id, teacher_id = info[cs_id]
+            busy = class_busy.get(class_id, 0) | (teacher_busy.get(teacher_id, 0) if teacher_id else 0)
+            if spread:
+                for d in _bits(used_days[cs_id]):
+                    busy |= self.day_masks[d]
+            return self.full & ~busy & ~at_capacity[0]
+
+        def candidates(cs_id):
+            class_id = info[cs_id][0]
+            class_mask = class_busy.get(class_id, 0)
+            slots = list(_bits(free_slots(cs_id)))
+            # Lightest days for the class first, then the least crowded slot
+            rng.shuffle(slots)
+            slots.sort(key=lambda s: (
+                bin(class_mask & self.day_masks[s // self.per_day]).count('1'),
+                load[s],
+            ))
+            return slots
+
+        def place(cs_id, slot, sign):
+            class_id, teacher_id = info[cs_id]
+            bit = 1 << slot
+            class_busy[class_id] = class_busy.get(class_id, 0) ^ bit
+            if teacher_id:
+                teacher_busy[teacher_id] = teacher_busy.get(teacher_id, 0) ^ bit
+            used_days[cs_id] ^= 1 << (slot // self.per_day)
+            load[slot] += sign
+            if capacity is not None:
+                if load[slot] >= capacity:
+                    at_capacity[0] |= bit
+                else:
+                    at_capacity[0] &= ~bit
+            remaining[cs_id] -= sign
+            if sign > 0:
+                placed[cs_id].append(slot)
+            else:
+                placed[cs_id].pop()
+
+        def pick():
+            best, best_count = None, None
+            for cs_id, left in remaining.items():
+                if not left:
+                    continue
+                count = bin(free_slots(cs_id)).count('1')
+                # Fewest free slots relative to lessons still to place
+                key = (count - left, count, tiebreak[cs_id])
+                if best is None or key < best_count:
+                    best, best_count = cs_id, key
+                    if count < left:
+                        break
+            return best
+
+        stack = []
+        nodes = 0
+        cs_id = pick()
+        options = candidates(cs_id) if cs_id else []
+        while cs_id is not None:
+            nodes += 1
+            if nodes > node_limit:
+                return None
+            if options:
+                slot = options.pop(0)
+                place(cs_id, slot, 1)
+                stack.append((cs_id, slot, options))
+                cs_id = pick()
+                options = candidates(cs_id) if cs_id else []
+                continue
+            if not stack:
+                return None
+            cs_id, slot, options = stack.pop()
+            place(cs_id, slot, -1)
+        return placed
+
+    def lessons(self, placement, class_subjects):
+        """Turn a placement into Lesson tuples with rooms assigned."""
+        by_id = {cs.id: cs for cs in class_subjects}
+        class_ids = sorted({cs.class_name_id for cs in class_subjects})
+        home = {class_id: self.rooms[i % len(self.rooms)] for i, class_id in enumerate(class_ids)} if self.rooms else {}
+
+        by_slot = defaultdict(list)
+        for cs_id, slots in placement.items():
+            for slot in slots:
+                by_slot[slot].append(by_id[cs_id])
+
+        lessons = []
+        for slot, entries in sorted(by_slot.items()):
+            taken = set(self.fixed_rooms[slot])
+            wanted = sorted(entries, key=lambda cs: home.get(cs.class_name_id) in taken)
+            for cs in wanted:
+                room = ''
+                if self.rooms:
+                    room = home[cs.class_name_id]
+                    if room in taken:
+                        room = next(r for r in self.rooms if r not in taken)
+                    taken.add(room)
+                start, end = self.slots[slot % self.per_day]
+                lessons.append(Lesson(cs.id, cs.class_name_id, self.days[slot // self.per_day], start, end, room))
+        return lessons
+
+
+def build_timetable(class_subjects, days=DEFAULT_DAYS, slots=DEFAULT_SLOTS, rooms=(), fixed=(),
+                    seed=None, node_limit=NODE_LIMIT, restart_nodes=RESTART_NODES):
+    """Solve a timetable for ``class_subjects``; return a list of Lesson tuples.
+
+    ``fixed`` are Timetable rows that stay in place (other classes), whose
+    teachers and rooms are treated as busy.
+    """
+    class_subjects = list(class_subjects)
+    problem = _Problem(class_subjects, days, slots, rooms, fixed)
+    problem.check()
+
+    rng = random.Random(seed)
+    for spread in (True, False):
+        budget = node_limit
+        while budget > 0:
+            placement = problem.solve(rng, spread, min(restart_nodes, budget))
+            if placement is not None:
+                return problem.lessons(placement, class_subjects)
+            budget -= restart_nodes
+    raise TimetableError("No clash-free timetable found; reduce periods per week or add rooms")
+
+
+def generate_timetable(classes=None, rooms=(), seed=None, dry_run=False, grid=None, **options):
+    """Regenerate the timetable of ``classes`` (default: every current class) in one transaction.
+
+    Lessons follow ``grid`` (default: the current year's bell schedule).
+    Without ``rooms`` each class stays in its own classroom and rooms are
+    left blank. Returns the list of Lesson tuples written.
+    """
+    grid = grid or get_slot_grid()
+    class_subjects = ClassSubject.objects.select_related('class_name', 'teacher__user')
+    if classes is not None:
+        class_subjects = class_subjects.filter(class_name__in=classes)
+    else:
+        class_subjects = class_subjects.filter(class_name__academic_year__is_current=True)
+    class_subjects = list(class_subjects)
+    class_ids = {cs.class_name_id for cs in class_subjects}
+
+    fixed = []
+    if classes is not None:
+        # The rest of the same years' timetables stay and block their teachers
+        years = {cs.class_name.academic_year_id for cs in class_subjects}
+        fixed = list(Timetable.objects.select_related('class_subject').filter(
+            class_subject__class_name__academic_year_id__in=years,
+        ).exclude(class_subject__class_name_id__in=class_ids))
+
+    lessons = build_timetable(class_subjects, days=grid.days, slots=grid.slots, rooms=rooms,
+                              fixed=fixed, seed=seed, **options)
+    if dry_run:
+        return lessons
+
+    with transaction.atomic():
+        Timetable.objects.filter(class_subject__class_name_id__in=class_ids).delete()
+        Timetable.objects.bulk_create([
+            Timetable(
+                class_subject_id=lesson.class_subject_id,
+                day=lesson.day,
+                start_time=lesson.start_time,
+                end_time=lesson.end_time,
+                room=lesson.room,
+            )
+            for lesson in lessons
+        ], batch_size=500)
+        # bulk_create skips post_save
+        transaction.on_commit(bump_timetable_version)
+    return lessons
+
+
+def class_timetable_clashes(school_class, cells, grid=None):
+    """Describe every teacher or room clash ``cells`` would cause with other classes.
+
+    ``cells`` maps ``(day, lesson index)`` to ``(ClassSubject, room)`` for
+    the class's whole grid. The rest of the year's classes are indexed with
+    a single query.
+    """
+    grid = grid or get_slot_grid(school_class.academic_year_id)
+    index = OccupancyIndex.load(grid.days, grid.slots, academic_year=school_class.academic_year_id,
+                                exclude_classes=[school_class])
+    problems = []
+    for (day, period), (class_subject, room) in sorted(cells.items()):
+        start, end = grid.slots[period]
+        mask = index.slot_mask(day, start, end)
+        for kind, slot, held_by in index.clashes(mask, class_subject.teacher_id, room):
+            if kind == 'teacher':
+                problems.append(f"{index.slot_label(slot)}: {class_subject.teacher} already teaches {held_by}")
+            else:
+                problems.append(f"{index.slot_label(slot)}: {room} is already used by {held_by}")
+    return problems
+
+
+def save_class_timetable(school_class, cells, grid=None):
+    """Make the class's lessons on the slot grid match ``cells`` in one transaction.
+
+    Only the differences are written: new cells are bulk-created, changed
+    ones bulk-updated and emptied ones deleted together. Returns
+    ``(created, updated, deleted)``.
+    """
+    grid = grid or get_slot_grid(school_class.academic_year_id)
+    existing = {}
+    duplicates = []
+    rows = Timetable.objects.filter(
+        class_subject__class_name=school_class, day__in=grid.days, start_time__in=[start for start, _ in grid.slots],
+    ).order_by('id')
+    for row in rows:
+        if (row.day, row.start_time) in existing:
+            duplicates.append(row.id)
+        else:
+            existing[(row.day, row.start_time)] = row
+
+    to_create, to_update, to_delete = [], [], list(duplicates)
+    for day in grid.days:
+        for period, (start, end) in enumerate(grid.slots):
+            row = existing.get((day, start))
+            cell = cells.get((day, period))
+            if cell is None:
+                if row:
+                    to_delete.append(row.id)
+                continue
+            class_subject, room = cell
+            if row is None:
+                to_create.append(Timetable(
+                    class_subject=class_subject, day=day, start_time=start, end_time=end, room=room,
+                ))
+            elif (row.class_subject_id, row.end_time, row.room) != (class_subject.id, end, room):
+                row.class_subject = class_subject
+                row.end_time = end
+                row.room = room
+                to_update.append(row)
+
+    if not (to_create or to_update or to_delete):
+        return 0, 0, 0
+    with transaction.atomic():
+        if to_delete:
+            Timetable.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            Timetable.objects.bulk_update(to_update, ['class_subject', 'end_time', 'room'])
+        if to_create:
+            Timetable.objects.bulk_create(to_create)
+        # bulk_create and bulk_update skip post_save
+        transaction.on_commit(bump_timetable_version)
+    return len(to_create), len(to_update), len(to_delete)
+
+
+def timetable_version():
+    """Token that changes whenever any lesson does."""
+    return get_cache_version(TIMETABLE_VERSION_KEY)
+
+
+def bump_timetable_version():
+    bump_cache_version(TIMETABLE_VERSION_KEY)
+
+
+def master_timetable_cache_key(academic_year):
+    return f'academics:master_timetable:{academic_year.pk}:{timetable_version()}'
+
+
+def master_timetable(academic_year, grid=None):
+    """Every class's week for ``academic_year`` as ``[(day name, [(class, cells), ...]), ...]``.
+
+    ``cells`` are the ``(period, entry)`` pairs of ``SlotGrid.rows`` for
+    that class and day. All lessons come from a single query.
+    """
+    grid = grid or get_slot_grid(academic_year)
+    classes = list(Class.objects.filter(academic_year=academic_year).order_by('name'))
+    entries = Timetable.objects.filter(
+        class_subject__class_name__academic_year=academic_year,
+    ).select_related('class_subject__subject', 'class_subject__teacher__user')
+
+    by_class = defaultdict(list)
+    for entry in entries:
+        by_class[entry.class_subject.class_name_id].append(entry)
+
+    days = [(name, []) for name in grid.day_names()]
+    for school_class in classes:
+        for (_name, rows), (_day, cells) in zip(days, grid.rows(by_class[school_class.id])):
+            rows.append((school_class, cells))
+    return days
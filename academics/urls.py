@@ -12,5 +12,8 @@ urlpatterns = [
     path('settings/', views.school_settings_view, name='school_settings'),
     path('timetable/', views.timetable_view, name='timetable'),
     path('timetable/edit/<int:class_id>/', views.edit_timetable, name='edit_timetable'),
+    path('timetable/master/', views.master_timetable_view, name='master_timetable'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
     path('global-search/', views.global_search, name='global_search'),
 ]
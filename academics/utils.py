@@ -0,0 +1,62 @@
+"""
+Cache helpers.
+
+Nearly every page shows the school name and logo, so ``get_school_info``
+keeps the row in the process-local ``local`` cache for a minute (dropped
+by ``academics.signals`` whenever it is saved or deleted; other workers
+catch up when their copy expires) and memoizes it on the request, so a page
+that renders several templates and helpers still looks it up at most once.
+
+Caches with many entries (rendered timetables, calendar feeds) are keyed
+by a version token instead: ``bump_cache_version`` retires all of them
+at once without having to find and delete each key.
+"""
+import uuid
+
+from django.core.cache import cache, caches
+
+from academics.models import SchoolInfo
+
+SCHOOL_INFO_CACHE_KEY = 'academics:school_info'
+# Held per process, so a save only clears the worker that made it; the
+# timeout bounds how long the others show the old header.
+SCHOOL_INFO_CACHE_TIMEOUT = 60
+
+# Cached in place of None so "no SchoolInfo row yet" is cached too
+_MISSING = 'missing'
+
+
+def get_school_info(request=None):
+    """Return the SchoolInfo row (or None), cached across and within requests."""
+    if request is not None and hasattr(request, '_school_info'):
+        return request._school_info
+
+    info = caches['local'].get(SCHOOL_INFO_CACHE_KEY)
+    if info is None:
+        info = SchoolInfo.objects.first() or _MISSING
+        caches['local'].set(SCHOOL_INFO_CACHE_KEY, info, SCHOOL_INFO_CACHE_TIMEOUT)
+    if not isinstance(info, SchoolInfo):
+        info = None
+
+    if request is not None:
+        request._school_info = info
+    return info
+
+
+def invalidate_school_info():
+    caches['local'].delete(SCHOOL_INFO_CACHE_KEY)
+
+
+def get_cache_version(key):
+    """The version token stored under ``key``, created on first use."""
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(key):
+    # A fresh token rather than a counter, so a lost key cannot bring back old entries
+    cache.set(key, uuid.uuid4().hex, None)
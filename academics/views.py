@@ -1,15 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.urls import reverse
-import datetime
-from django.db import connection, ProgrammingError
+from django.db import connection
 from django.db.models import Q
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_POST, require_safe
 from accounts.models import User
 from announcements.models import Announcement
-from .models import Activity, GalleryImage, SchoolInfo, Class, Timetable, ClassSubject, Resource
+from .models import AcademicYear, Activity, CalendarFeedToken, GalleryImage, SchoolInfo, Class, Timetable, ClassSubject, Resource
+from .feeds import FEED_MAX_AGE, feed_token_for, get_feed
 from .forms import SchoolInfoForm, GalleryImageForm, ResourceForm
+from .timetabling import (
+    MASTER_TIMETABLE_CACHE_TIMEOUT, class_timetable_clashes, get_slot_grid, master_timetable,
+    master_timetable_cache_key, save_class_timetable,
+)
+from .utils import get_school_info
 
 @login_required
 def manage_resources(request):
@@ -149,7 +158,7 @@ def school_settings_view(request):
         messages.error(request, 'Access denied')
         return redirect('dashboard')
     
-    info = SchoolInfo.objects.first()
+    info = get_school_info(request)
     if not info:
         info = SchoolInfo()
         
@@ -172,8 +181,8 @@ def timetable_view(request):
         return redirect('dashboard')
 
     classes = Class.objects.filter(academic_year__is_current=True)
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    timetable_grid = {day: [] for day in days}
+    entries = []
+    grid = None
     
     selected_class = None
     is_teacher_schedule = False
@@ -185,11 +194,7 @@ def timetable_view(request):
             class_subject__teacher__user=request.user,
             class_subject__class_name__academic_year__is_current=True
         ).select_related('class_subject__subject', 'class_subject__class_name')
-        
-        for entry in entries:
-            day_name = entry.get_day_display()
-            if day_name in timetable_grid:
-                timetable_grid[day_name].append(entry)
+        grid = get_slot_grid()
                 
     else:
         # Admin and Student see Class Timetables
@@ -204,26 +209,44 @@ def timetable_view(request):
         
         if selected_class_id:
             selected_class = get_object_or_404(Class, id=selected_class_id)
-            entries = Timetable.objects.filter(class_subject__class_name=selected_class).select_related('class_subject__subject', 'class_subject__teacher')
-            
-            for entry in entries:
-                day_name = entry.get_day_display()
-                if day_name in timetable_grid:
-                    timetable_grid[day_name].append(entry)
-        
-        # Sort each day by start time
-    for day in days:
-        timetable_grid[day].sort(key=lambda x: x.start_time)
+            entries = Timetable.objects.filter(class_subject__class_name=selected_class).select_related('class_subject__subject', 'class_subject__teacher__user')
+            grid = get_slot_grid(selected_class.academic_year_id)
 
     context = {
         'classes': classes,
         'selected_class': selected_class,
-        'timetable': timetable_grid,
-        'days': days,
+        'grid': grid,
+        # (day, period) -> lesson, laid out once so the template never searches
+        'timetable_rows': grid.rows(entries) if grid else [],
         'is_teacher_schedule': is_teacher_schedule,
     }
     return render(request, 'academics/timetable.html', context)
 
+@login_required
+def master_timetable_view(request):
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('dashboard')
+
+    academic_year = AcademicYear.objects.filter(is_current=True).first()
+    table = ''
+    if academic_year:
+        # Rendered once per timetable version; any lesson change retires it
+        cache_key = master_timetable_cache_key(academic_year)
+        table = cache.get(cache_key)
+        if table is None:
+            grid = get_slot_grid(academic_year)
+            table = render_to_string('academics/_master_timetable.html', {
+                'periods': grid.lessons,
+                'days': master_timetable(academic_year, grid),
+            })
+            cache.set(cache_key, table, MASTER_TIMETABLE_CACHE_TIMEOUT)
+
+    return render(request, 'academics/master_timetable.html', {
+        'academic_year': academic_year,
+        'table': table,
+    })
+
 @login_required
 def edit_timetable(request, class_id):
     if request.user.user_type != 'admin':
@@ -231,90 +254,48 @@ def edit_timetable(request, class_id):
         return redirect('academics:timetable')
     
     school_class = get_object_or_404(Class, id=class_id)
-    class_subjects = ClassSubject.objects.filter(class_name=school_class).select_related('subject')
+    class_subjects = ClassSubject.objects.filter(class_name=school_class).select_related('subject', 'teacher__user')
     
-    # Define standard time slots
+    # Lesson periods of the class's bell schedule
+    grid = get_slot_grid(school_class.academic_year_id)
     slots = [
-        {'start': '07:00:00', 'end': '08:40:00', 'label': 'Lesson 1'},
-        {'start': '08:40:00', 'end': '09:50:00', 'label': 'Lesson 2'},
-        {'start': '10:20:00', 'end': '11:30:00', 'label': 'Lesson 3'},
-        {'start': '11:30:00', 'end': '12:40:00', 'label': 'Lesson 4'},
-        {'start': '13:00:00', 'end': '14:00:00', 'label': 'Lesson 5'},
+        {'start': p.start_time.strftime('%H:%M:%S'), 'end': p.end_time.strftime('%H:%M:%S'), 'label': p.name}
+        for p in grid.lessons
     ]
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    day_map = {day: idx for idx, day in enumerate(days)}
+    days = grid.day_names()
 
     if request.method == 'POST':
-        # Clear existing timetable for standard slots to avoid complex updates
-        # But maybe we should be more granular. 
-        # Strategy: Iterate through POST data, update/create.
-        
-        updated_count = 0
-        for day in days:
-            day_idx = day_map[day]
+        # Read the whole grid first so nothing is written if any cell clashes
+        by_id = {str(cs.id): cs for cs in class_subjects}
+        cells = {}
+        timetable_data = {}
+        room_data = {}
+        for day_value, day in zip(grid.days, days):
             for slot_idx, slot in enumerate(slots):
-                field_name = f"slot_{day}_{slot_idx}"
-                subject_id = request.POST.get(field_name)
-                
-                start_time = datetime.datetime.strptime(slot['start'], "%H:%M:%S").time()
-                end_time = datetime.datetime.strptime(slot['end'], "%H:%M:%S").time()
-
-                # Find existing entry
-                existing = Timetable.objects.filter(
-                    class_subject__class_name=school_class,
-                    day=day_idx,
-                    start_time=start_time
-                ).first()
-
-                if subject_id:
-                    # Update or Create
-                    try:
-                        cs = ClassSubject.objects.get(id=subject_id)
-                        if existing:
-                            existing.class_subject = cs
-                            existing.end_time = end_time # Ensure end time matches slot
-                            existing.save()
-                        else:
-                            Timetable.objects.create(
-                                class_subject=cs,
-                                day=day_idx,
-                                start_time=start_time,
-                                end_time=end_time
-                            )
-                        updated_count += 1
-                    except ClassSubject.DoesNotExist:
-                        pass
-                else:
-                    # Remove if it exists and field is empty
-                    if existing:
-                        try:
-                            existing.delete()
-                        except ProgrammingError as e:
-                            # Fallback if announcements_notification table is missing (migration issue)
-                            if 'announcements_notification' in str(e):
-                                with connection.cursor() as cursor:
-                                    try:
-                                        # Try simple delete first
-                                        cursor.execute("DELETE FROM academics_timetable WHERE id = %s", [existing.id])
-                                    except Exception as inner_e:
-                                        # If simple delete fails due to constraints, try ignoring constraints? 
-                                        # Postgres doesn't easily allow disabling constraints session-wide for a specific table without superuser.
-                                        # But if the table is missing, foreign keys from it shouldn't exist?
-                                        # The error suggests the RELATION is missing, so checking it for cascade is failing.
-                                        raise inner_e
-                            else:
-                                raise e
-        
-        messages.success(request, f'Timetable updated for {school_class.name}')
-        return redirect('academics:timetable')
-
-    # Prepare current data for form pre-fill
-    timetable_data = {}
-    entries = Timetable.objects.filter(class_subject__class_name=school_class)
-    for entry in entries:
-        day_name = entry.get_day_display()
-        time_key = entry.start_time.strftime("%H:%M:%S")
-        timetable_data[f"{day_name}_{time_key}"] = entry.class_subject.id
+                cs = by_id.get(request.POST.get(f"slot_{day}_{slot_idx}"))
+                room = request.POST.get(f"room_{day}_{slot_idx}", '').strip()[:50]
+                key = f"{day}_{slot['start']}"
+                room_data[key] = room
+                if cs:
+                    cells[(day_value, slot_idx)] = (cs, room)
+                    timetable_data[key] = cs.id
+
+        clashes = class_timetable_clashes(school_class, cells, grid)
+        if clashes:
+            messages.error(request, 'Timetable not saved: ' + '; '.join(clashes))
+        else:
+            save_class_timetable(school_class, cells, grid)
+            messages.success(request, f'Timetable updated for {school_class.name}')
+            return redirect('academics:timetable')
+    else:
+        # Prepare current data for form pre-fill
+        timetable_data = {}
+        room_data = {}
+        entries = Timetable.objects.filter(class_subject__class_name=school_class)
+        for entry in entries:
+            key = f"{entry.get_day_display()}_{entry.start_time.strftime('%H:%M:%S')}"
+            timetable_data[key] = entry.class_subject_id
+            room_data[key] = entry.room
 
     context = {
         'school_class': school_class,
@@ -322,6 +303,7 @@ def edit_timetable(request, class_id):
         'slots': slots,
         'days': days,
         'timetable_data': timetable_data,
+        'room_data': room_data,
     }
     return render(request, 'academics/edit_timetable.html', context)
 
@@ -428,3 +410,30 @@ def global_search(request):
 
     return JsonResponse({'results': results})
 
+
+@require_safe
+def calendar_feed(request, token):
+    """The .ics schedule for the token's owner; no login, since calendar apps poll it."""
+    feed_token = CalendarFeedToken.objects.select_related('user').filter(token=token).first()
+    if feed_token is None or not feed_token.user.is_active:
+        raise Http404("Unknown calendar feed")
+
+    body, etag = get_feed(feed_token.user)
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'private, max-age={FEED_MAX_AGE}'
+    response['Content-Disposition'] = 'inline; filename="schedule.ics"'
+    # 304 when the app already holds this version
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+@login_required
+@require_POST
+def reset_calendar_feed(request):
+    feed_token_for(request.user).regenerate()
+    messages.success(request, 'Your calendar link has been reset. Subscribe again with the new link.')
+    if request.user.user_type == 'teacher':
+        return redirect('teachers:schedule')
+    if request.user.user_type == 'student':
+        return redirect('students:student_schedule')
+    return redirect('dashboard')
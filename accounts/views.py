@@ -233,10 +233,10 @@ def dashboard(request):
         # Redirect to enhanced student dashboard
         return redirect('students:student_dashboard')
     elif user.user_type == 'parent':
-        from finance.models import StudentFee
+        from finance.family import family_fee_summary
         parent_notices = base_notices.filter(target_audience__in=['all', 'parents'])
         
-        # Calculate fees for all children
+        # Fee totals for all children, cached per parent
         try:
             parent_profile = getattr(user, 'parent_profile', None)
             if not parent_profile:
@@ -245,14 +245,12 @@ def dashboard(request):
                  parent_profile = Parent.objects.filter(user=user).first()
             
             if parent_profile:
-                children = parent_profile.children.all()
-                total_outstanding = 0
-                total_paid = 0
+                children = list(parent_profile.children.select_related('current_class'))
+                family_fees = family_fee_summary(parent_profile)
                 for child in children:
-                    fees = StudentFee.objects.filter(student=child)
-                    for fee in fees:
-                        total_outstanding += fee.balance
-                        total_paid += fee.total_paid
+                    child.fee_totals = family_fees['children'].get(child.id)
+                total_outstanding = family_fees['outstanding']
+                total_paid = family_fees['paid']
             else:
                 children = []
                 total_outstanding = 0
@@ -1,16 +1,26 @@
 from django.db.utils import OperationalError, ProgrammingError
 
+from .notifications import unread_summary
+
+
 def user_notifications(request):
     if request.user.is_authenticated:
-        try:
-            # Assuming related_name='notifications' in the Notification model
-            # We fetch unread notifications
-            return {
-                'unread_notifications': request.user.notifications.filter(is_read=False).order_by('-created_at')[:5],
-                'unread_count': request.user.notifications.filter(is_read=False).count()
-            }
-        except (OperationalError, ProgrammingError):
-            # This happens if the table doesn't exist yet (e.g. before migration)
-            return {'unread_notifications': [], 'unread_count': 0}
+        summary = {}
+
+        def load():
+            # Runs the first time a template reads either value, then reuses it,
+            # so pages that never render the bell never look it up
+            if not summary:
+                try:
+                    summary.update(unread_summary(request.user))
+                except (OperationalError, ProgrammingError):
+                    # This happens if the table doesn't exist yet (e.g. before migration)
+                    summary.update(count=0, latest=[])
+            return summary
+
+        return {
+            'unread_notifications': lambda: load()['latest'],
+            'unread_count': lambda: load()['count'],
+        }
             
     return {}
@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-18 06:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_resource_curriculum_and_type'),
+        ('announcements', '0003_fix_notification_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='announcemen_recipie_5c130e_idx'),
+        ),
+    ]
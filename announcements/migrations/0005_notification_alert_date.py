@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 06:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_resource_curriculum_and_type'),
+        ('announcements', '0004_notification_unread_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='alert_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'timetable_slot', 'alert_type', 'alert_date'), name='unique_schedule_alert'),
+        ),
+    ]
@@ -34,9 +34,19 @@ class Notification(models.Model):
     # Link to the specific timetable slot to avoid duplicates
     timetable_slot = models.ForeignKey('academics.Timetable', on_delete=models.CASCADE, null=True, blank=True)
     alert_type = models.CharField(max_length=20, choices=[('45_min', '45 Minutes'), ('10_min', '10 Minutes')]) # To track which alert was sent
+    # Day of the lesson a schedule alert is for; one alert of each type per slot per day
+    alert_date = models.DateField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        # Unread list and count for the header bell
+        indexes = [models.Index(fields=['recipient', 'is_read', '-created_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'timetable_slot', 'alert_type', 'alert_date'],
+                name='unique_schedule_alert',
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient}: {self.message}"
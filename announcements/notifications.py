@@ -0,0 +1,46 @@
+"""
+Cached unread-notification counters.
+
+The header bell shows the unread count and the latest few unread
+notifications on every page. ``unread_summary`` keeps both per user in the
+process-local ``local`` cache; creating, reading or deleting a notification
+drops the entry (``announcements.signals``, plus ``invalidate_notifications``
+after bulk updates that skip the signals). That only reaches the process
+that made the change, so entries expire after half a minute and other
+workers (and notifications sent by the alert scheduler) show up by then.
+"""
+from django.core.cache import caches
+from django.db import transaction
+
+from announcements.models import Notification
+
+UNREAD_PREVIEW_SIZE = 5
+# Dropped on every change in this process; the timeout bounds how long other
+# processes show an old count.
+NOTIFICATION_CACHE_TIMEOUT = 30
+
+
+def _notifications_cache_key(user_id):
+    return f'announcements:unread:{user_id}'
+
+
+def unread_summary(user):
+    """Return ``{'count', 'latest'}`` for a user's unread notifications."""
+    user_id = getattr(user, 'pk', user)
+    key = _notifications_cache_key(user_id)
+    summary = caches['local'].get(key)
+    if summary is None:
+        unread = Notification.objects.filter(recipient_id=user_id, is_read=False)
+        latest = list(unread.order_by('-created_at')[:UNREAD_PREVIEW_SIZE])
+        # A short list is the whole set, so the count needs no second query
+        count = len(latest) if len(latest) < UNREAD_PREVIEW_SIZE else unread.count()
+        summary = {'count': count, 'latest': latest}
+        caches['local'].set(key, summary, NOTIFICATION_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_notifications(user_ids):
+    """Drop the cached unread summaries of ``user_ids`` once the transaction commits."""
+    keys = [_notifications_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: caches['local'].delete_many(keys))
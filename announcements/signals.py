@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from announcements.models import Notification
+from announcements.notifications import invalidate_notifications
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    """Refresh the recipient's bell after a notification is created, read or removed."""
+    invalidate_notifications([instance.recipient_id])
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Announcement
 from .forms import AnnouncementForm
+from .notifications import invalidate_notifications
 from django.db.models import Q
 
 @login_required
@@ -41,12 +42,15 @@ def manage_announcements(request):
 def mark_notification_read(request, notification_id):
     from .models import Notification
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.is_read = True
-    notification.save()
+    if not notification.is_read:
+        notification.is_read = True
+        notification.save(update_fields=['is_read'])
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
 
 @login_required
 def mark_all_notifications_read(request):
     request.user.notifications.filter(is_read=False).update(is_read=True)
+    # update() skips post_save, so refresh the bell here
+    invalidate_notifications([request.user.pk])
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
 
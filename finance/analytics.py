@@ -0,0 +1,199 @@
+"""
+Finance analytics cube.
+
+FeeCollectionFact holds receivable/collected/outstanding totals keyed by
+(academic year, term, class, fee head, date). Fee assignments and payments
+post their amounts into it as they happen (``post_fee`` / ``post_payment``;
+``post_fees`` / ``post_payments`` for bulk inserts), so the dashboard's
+drill-down charts aggregate a few hundred fact rows instead of scanning
+Payment.
+
+Class, head, year and term come from the fee's FeeStructure, so a student
+changing class later does not move money between classes.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from finance.models import FeeCollectionFact, FeeStructure, Payment, StudentFee
+
+ZERO = Decimal('0.00')
+
+_KEY_FIELDS = ('academic_year_id', 'term', 'school_class_id', 'fee_head_id', 'date')
+
+# Dashboard dimensions: name -> (group by, label, next dimension to drill into)
+DIMENSIONS = {
+    'year': ('academic_year_id', 'academic_year__name', 'term'),
+    'term': ('term', None, 'class'),
+    'class': ('school_class_id', 'school_class__name', 'head'),
+    'head': ('fee_head_id', 'fee_head__name', 'month'),
+    'month': ('month', None, 'date'),
+    'date': ('date', None, None),
+}
+
+# Query-string filters accepted by ``cube_rows``
+FILTERS = {
+    'year': 'academic_year_id',
+    'term': 'term',
+    'class': 'school_class_id',
+    'head': 'fee_head_id',
+    'date_from': 'date__gte',
+    'date_to': 'date__lte',
+}
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _structure_keys(structure_ids):
+    """``{fee_structure_id: (year_id, term, class_id, head_id)}`` in one query."""
+    return {
+        row[0]: row[1:] for row in FeeStructure.objects.filter(pk__in=structure_ids).values_list(
+            'id', 'academic_year_id', 'term', 'class_level_id', 'head_id',
+        )
+    }
+
+
+def _apply(deltas):
+    """Add ``{key: (receivable, collected)}`` deltas to the fact rows."""
+    for key, (receivable, collected) in deltas.items():
+        if not receivable and not collected:
+            continue
+        lookup = dict(zip(_KEY_FIELDS, key))
+        changes = {
+            'receivable': F('receivable') + receivable,
+            'collected': F('collected') + collected,
+            'outstanding': F('outstanding') + (receivable - collected),
+        }
+        if FeeCollectionFact.objects.filter(**lookup).update(**changes):
+            if receivable < 0 or collected < 0:
+                # A reversal may leave the row empty; drop it like a rebuild would
+                FeeCollectionFact.objects.filter(receivable=0, collected=0, **lookup).delete()
+            continue
+        try:
+            with transaction.atomic():
+                FeeCollectionFact.objects.create(
+                    receivable=receivable, collected=collected,
+                    outstanding=receivable - collected, **lookup
+                )
+        except IntegrityError:
+            # Created concurrently; add to that row instead
+            FeeCollectionFact.objects.filter(**lookup).update(**changes)
+
+
+def post_fee(fee_structure_id, assigned_on, amount):
+    """Book ``amount`` receivable for a fee (negative to reverse it)."""
+    keys = _structure_keys([fee_structure_id]).get(fee_structure_id)
+    if keys:
+        _apply({keys + (_as_date(assigned_on),): (Decimal(amount), ZERO)})
+
+
+def post_fees(fees):
+    """Book receivables for many new StudentFee rows at once."""
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    keys = _structure_keys({fee.fee_structure_id for fee in fees})
+    for fee in fees:
+        if fee.fee_structure_id in keys:
+            deltas[keys[fee.fee_structure_id] + (_as_date(fee.created_at),)][0] += fee.amount_payable
+    _apply(deltas)
+
+
+def post_payment(student_fee_id, paid_on, amount):
+    """Book ``amount`` collected for a payment (negative to reverse it)."""
+    structure_id = StudentFee.objects.filter(pk=student_fee_id).values_list(
+        'fee_structure_id', flat=True
+    ).first()
+    keys = _structure_keys([structure_id]).get(structure_id) if structure_id else None
+    if keys:
+        _apply({keys + (_as_date(paid_on),): (ZERO, Decimal(amount))})
+
+
+def post_payments(payments):
+    """Book collections for many new Payment rows at once."""
+    structures = dict(StudentFee.objects.filter(
+        pk__in={payment.student_fee_id for payment in payments}
+    ).values_list('id', 'fee_structure_id'))
+    keys = _structure_keys(set(structures.values()))
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    for payment in payments:
+        structure_keys = keys.get(structures.get(payment.student_fee_id))
+        if structure_keys:
+            deltas[structure_keys + (_as_date(payment.date),)][1] += payment.amount
+    _apply(deltas)
+
+
+def rebuild_facts():
+    """Recompute the whole fact table from StudentFee and Payment rows."""
+    structure = ('fee_structure__academic_year_id', 'fee_structure__term',
+                 'fee_structure__class_level_id', 'fee_structure__head_id')
+    totals = defaultdict(lambda: [ZERO, ZERO])
+
+    receivables = StudentFee.objects.annotate(day=TruncDate('created_at')).values(
+        *structure, 'day'
+    ).annotate(total=Sum('amount_payable')).order_by()
+    for row in receivables:
+        totals[tuple(row[f] for f in structure) + (row['day'],)][0] += row['total']
+
+    payment_structure = tuple(f'student_fee__{f}' for f in structure)
+    collections = Payment.objects.values(*payment_structure, 'date').annotate(
+        total=Sum('amount')
+    ).order_by()
+    for row in collections:
+        totals[tuple(row[f] for f in payment_structure) + (row['date'],)][1] += row['total']
+
+    facts = [
+        FeeCollectionFact(receivable=receivable, collected=collected,
+                          outstanding=receivable - collected, **dict(zip(_KEY_FIELDS, key)))
+        for key, (receivable, collected) in totals.items()
+    ]
+    with transaction.atomic():
+        FeeCollectionFact.objects.all().delete()
+        FeeCollectionFact.objects.bulk_create(facts, batch_size=500)
+    return len(facts)
+
+
+def cube_rows(dimension, filters=None):
+    """Totals from the fact table grouped by ``dimension``, after ``filters``.
+
+    Returns a list of ``{'key', 'label', 'receivable', 'collected', 'outstanding'}``.
+    """
+    group_by, label_field, _next = DIMENSIONS[dimension]
+    facts = FeeCollectionFact.objects.filter(**{
+        FILTERS[name]: value for name, value in (filters or {}).items() if name in FILTERS
+    })
+    if group_by == 'month':
+        facts = facts.annotate(month=TruncMonth('date'))
+
+    fields = [group_by] + ([label_field] if label_field else [])
+    rows = facts.values(*fields).annotate(
+        receivable=Sum('receivable'), collected=Sum('collected'), outstanding=Sum('outstanding'),
+    ).order_by(group_by)
+
+    term_labels = dict(FeeCollectionFact._meta.get_field('term').choices)
+    result = []
+    for row in rows:
+        key = row[group_by]
+        if label_field:
+            label = row[label_field]
+        elif group_by == 'term':
+            label = term_labels.get(key, key)
+        elif group_by == 'month':
+            label = key.strftime('%b %Y')
+        else:
+            label = key.isoformat()
+        result.append({
+            'key': key.isoformat() if hasattr(key, 'isoformat') else key,
+            'label': str(label),
+            'receivable': row['receivable'] or ZERO,
+            'collected': row['collected'] or ZERO,
+            'outstanding': row['outstanding'] or ZERO,
+        })
+    return result
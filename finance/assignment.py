@@ -0,0 +1,132 @@
+"""
+Bulk fee assignment.
+
+``assign_structures`` gives every student in a structure's class a StudentFee
+for it: the rosters of all the classes involved come back in one query, the
+existing (student, structure) pairs in another, and the missing rows go in
+with ``bulk_create(ignore_conflicts=True)``. The rows that were really
+inserted are read back afterwards, so a conflict skipped by the insert is
+neither counted nor booked twice. Assigning fees to the whole school is a
+handful of queries however many students there are.
+
+``copy_structure_to_classes`` and ``rollover_structures`` create the
+FeeStructure rows themselves for many classes at once.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from academics.models import Class
+from finance.analytics import post_fees
+from finance.family import invalidate_family_fees
+from finance.models import FeeStructure, StudentFee
+from students.models import Student
+
+
+def assign_structures(structures):
+    """Create missing StudentFee rows for ``structures``; return how many were created."""
+    structures = list(structures)
+    if not structures:
+        return 0
+
+    class_ids = {s.class_level_id for s in structures}
+    roster = {}
+    for student_id, class_id in Student.objects.filter(
+        current_class_id__in=class_ids
+    ).values_list('id', 'current_class_id'):
+        roster.setdefault(class_id, []).append(student_id)
+
+    with transaction.atomic():
+        # Two assignments of the same structures wait for each other here
+        list(FeeStructure.objects.select_for_update().filter(pk__in=[s.pk for s in structures]))
+        existing = set(StudentFee.objects.filter(
+            fee_structure__in=structures
+        ).values_list('student_id', 'fee_structure_id'))
+        new_fees = [
+            StudentFee(
+                student_id=student_id,
+                fee_structure=structure,
+                amount_payable=structure.amount,
+                # bulk_create skips StudentFee.save(), so seed the ledger here
+                balance=structure.amount,
+            )
+            for structure in structures
+            for student_id in roster.get(structure.class_level_id, [])
+            if (student_id, structure.id) not in existing
+        ]
+        if not new_fees:
+            return 0
+
+        last_id = StudentFee.objects.aggregate(last=Max('id'))['last'] or 0
+        StudentFee.objects.bulk_create(new_fees, ignore_conflicts=True, batch_size=500)
+        # ignore_conflicts leaves no trace of skipped rows, so read back what went in
+        created = [
+            fee for fee in StudentFee.objects.filter(
+                fee_structure__in=structures, id__gt=last_id,
+            ).only('id', 'student_id', 'fee_structure_id', 'amount_payable', 'created_at')
+            if (fee.student_id, fee.fee_structure_id) not in existing
+        ]
+        post_fees(created)
+        invalidate_family_fees(student_ids={fee.student_id for fee in created})
+    return len(created)
+
+
+def _copy_structures(structures, class_for, academic_year, term):
+    """Create one copy per (structure, target class); existing ones are kept."""
+    copies = []
+    for structure in structures:
+        for class_obj in class_for(structure):
+            copies.append(FeeStructure(
+                head_id=structure.head_id,
+                class_level=class_obj,
+                academic_year=academic_year,
+                term=term,
+                amount=structure.amount,
+                due_date=structure.due_date,
+            ))
+    if not copies:
+        return []
+
+    FeeStructure.objects.bulk_create(copies, ignore_conflicts=True)
+    wanted = {(c.head_id, c.class_level_id) for c in copies}
+    return [
+        s for s in FeeStructure.objects.filter(
+            academic_year=academic_year,
+            term=term,
+            head_id__in={head_id for head_id, _ in wanted},
+            class_level__in={class_id for _, class_id in wanted},
+        ).select_related('head', 'class_level')
+        if (s.head_id, s.class_level_id) in wanted
+    ]
+
+
+def copy_structure_to_classes(structure, classes):
+    """Apply ``structure``'s head, term and amount to each of ``classes``.
+
+    Returns the structures for the fee head/term in ``structure``'s class and
+    every class in ``classes`` (classes that already had one keep theirs).
+    """
+    classes = [c for c in classes if c.pk != structure.class_level_id]
+    copies = _copy_structures(
+        [structure], lambda _structure: classes, structure.academic_year, structure.term,
+    )
+    return [structure] + [s for s in copies if s.pk != structure.pk]
+
+
+def rollover_structures(from_year, from_term, to_year, to_term):
+    """Copy every fee structure of one term to another.
+
+    Each structure goes to the class with the same name in ``to_year`` (the
+    same class when rolling over within a year). Returns the target term's
+    structures (including any that already existed).
+    """
+    source = list(FeeStructure.objects.filter(academic_year=from_year, term=from_term))
+    names = dict(Class.objects.filter(
+        id__in={s.class_level_id for s in source}
+    ).values_list('id', 'name'))
+    targets = {c.name: c for c in Class.objects.filter(academic_year=to_year)}
+
+    def class_for(structure):
+        target = targets.get(names.get(structure.class_level_id))
+        return [target] if target else []
+
+    return _copy_structures(source, class_for, to_year, to_term)
@@ -0,0 +1,77 @@
+"""
+Fee totals for a parent's children.
+
+``family_fee_summary`` sums the stored StudentFee ledger columns for every
+child of a parent in one grouped query and keeps the result in the cache.
+Payments, fee changes and changes to the parent's children drop the cached
+entry (see ``finance.signals``), so the parent dashboard and the children
+pages read it without touching StudentFee on most requests.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from finance.models import StudentFee
+from parents.models import Parent
+
+ZERO = Decimal('0.00')
+
+# Entries are dropped on every write that affects them; the timeout only
+# bounds staleness after edits that skip the signals (raw SQL, reconciles).
+FAMILY_FEES_CACHE_TIMEOUT = 60 * 60
+
+
+def _family_cache_key(parent_id):
+    return f'finance:family:{parent_id}'
+
+
+def _build_family_fees(parent_id):
+    children = {
+        child_id: {'outstanding': ZERO, 'paid': ZERO}
+        for child_id in Parent.children.through.objects.filter(
+            parent_id=parent_id
+        ).values_list('student_id', flat=True)
+    }
+    rows = StudentFee.objects.filter(student__parents=parent_id).values('student_id').annotate(
+        outstanding=Sum('balance'), paid=Sum('amount_paid'),
+    ).order_by()
+    for row in rows:
+        children[row['student_id']] = {
+            'outstanding': row['outstanding'] or ZERO,
+            'paid': row['paid'] or ZERO,
+        }
+    return {
+        'outstanding': sum((c['outstanding'] for c in children.values()), ZERO),
+        'paid': sum((c['paid'] for c in children.values()), ZERO),
+        'children': children,
+    }
+
+
+def family_fee_summary(parent):
+    """Return ``{'outstanding', 'paid', 'children': {student_id: {'outstanding', 'paid'}}}``."""
+    parent_id = getattr(parent, 'pk', parent)
+    key = _family_cache_key(parent_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = _build_family_fees(parent_id)
+        cache.set(key, summary, FAMILY_FEES_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_family_fees(student_ids=(), parent_ids=()):
+    """Drop cached summaries for the parents of ``student_ids`` and for ``parent_ids``.
+
+    The keys are deleted after the surrounding transaction commits so a
+    concurrent request cannot cache the pre-commit totals again.
+    """
+    parent_ids = set(parent_ids)
+    student_ids = set(student_ids)
+    if student_ids:
+        parent_ids.update(Parent.children.through.objects.filter(
+            student_id__in=student_ids
+        ).values_list('parent_id', flat=True))
+    if parent_ids:
+        keys = [_family_cache_key(parent_id) for parent_id in parent_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
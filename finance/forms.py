@@ -1,5 +1,5 @@
 from django import forms
-from .models import FeeHead, FeeStructure, Payment, StudentFee
+from .models import TERM_CHOICES, FeeHead, FeeStructure, Payment, StudentFee
 from academics.models import Class, AcademicYear
 
 class FeeHeadForm(forms.ModelForm):
@@ -8,6 +8,17 @@ class FeeHeadForm(forms.ModelForm):
         fields = ['name', 'description']
 
 class FeeStructureForm(forms.ModelForm):
+    also_classes = forms.ModelMultipleChoiceField(
+        queryset=Class.objects.none(),
+        required=False,
+        label="Also apply to",
+        help_text="Create the same fee for these classes too.",
+    )
+    whole_year = forms.BooleanField(
+        required=False,
+        label="Apply to every class in the academic year",
+    )
+
     class Meta:
         model = FeeStructure
         fields = ['head', 'class_level', 'academic_year', 'term', 'amount', 'due_date']
@@ -18,6 +29,13 @@ class FeeStructureForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['academic_year'].queryset = AcademicYear.objects.filter(is_current=True)
+        self.fields['also_classes'].queryset = Class.objects.filter(academic_year__is_current=True)
+
+    def target_classes(self):
+        """Classes besides ``class_level`` that should get this fee."""
+        if self.cleaned_data.get('whole_year'):
+            return Class.objects.filter(academic_year=self.cleaned_data['academic_year'])
+        return self.cleaned_data.get('also_classes') or []
 
 class PaymentForm(forms.ModelForm):
     class Meta:
@@ -27,3 +45,24 @@ class PaymentForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date'}),
             'remarks': forms.Textarea(attrs={'rows': 2}),
         }
+
+class PaymentImportForm(forms.Form):
+    statement = forms.FileField(help_text="CSV with admission_number, amount, date and reference columns.")
+    method = forms.ChoiceField(
+        choices=Payment._meta.get_field('method').choices,
+        initial='Bank Transfer',
+        help_text="Used for rows without a method column.",
+    )
+    dry_run = forms.BooleanField(required=False, label="Check only (don't save)")
+
+class DefaultersFilterForm(forms.Form):
+    school_class = forms.ModelChoiceField(queryset=Class.objects.none(), required=False, label="Class")
+    term = forms.ChoiceField(choices=(('', 'All terms'),) + TERM_CHOICES, required=False)
+    head = forms.ModelChoiceField(queryset=FeeHead.objects.all(), required=False, label="Fee type")
+    min_balance = forms.DecimalField(required=False, min_value=0, decimal_places=2, label="Minimum owing")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['school_class'].queryset = Class.objects.filter(academic_year__is_current=True)
+        for name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control' if name == 'min_balance' else 'form-select'
@@ -0,0 +1,224 @@
+"""
+Payment import from bank / mobile-money CSV statements.
+
+``import_payments`` reads the statement row by row and works in chunks: each
+chunk resolves its admission numbers, the students' fees and the references
+already on file with one query apiece, then inserts its payments with
+``bulk_create``. Nothing goes through ``Payment.save()``, so the fee ledgers
+of the affected StudentFee rows are recomputed once at the end, and the
+analytics cube and family fee caches are updated in one pass.
+
+Expected columns (header names are case-insensitive):
+
+* ``admission_number`` (or ``admission_no`` / ``student``)
+* ``amount``
+* ``date``: ``YYYY-MM-DD``, ``DD/MM/YYYY`` or ``DD-MM-YYYY``
+* ``reference`` (or ``ref`` / ``transaction_id``), used to skip duplicates
+* ``method`` (optional)
+* ``fee``: a fee type name such as "Tuition Fee" (optional)
+
+A row without a ``fee`` column goes to the student's earliest-due fee that
+still has a balance, counting what earlier rows in the file already paid.
+"""
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from finance.analytics import post_payments
+from finance.family import invalidate_family_fees
+from finance.ledger import recompute_ledgers
+from finance.models import Payment, StudentFee
+from students.models import Student
+
+CHUNK_SIZE = 1000
+
+_COLUMNS = {
+    'admission_number': ('admission_number', 'admission_no', 'student'),
+    'amount': ('amount',),
+    'date': ('date',),
+    'reference': ('reference', 'ref', 'transaction_id'),
+    'method': ('method',),
+    'fee': ('fee',),
+}
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+_METHODS = {value.lower(): value for value, _label in Payment._meta.get_field('method').choices}
+_AMOUNT_FIELD = Payment._meta.get_field('amount')
+# Largest amount Payment.amount can store, e.g. 99999999.99 for max_digits=10
+_MAX_AMOUNT = Decimal(10) ** (_AMOUNT_FIELD.max_digits - _AMOUNT_FIELD.decimal_places) - Decimal('0.01')
+
+
+class PaymentImportError(ValueError):
+    """A statement row that cannot be imported."""
+
+
+def _column_map(fieldnames):
+    found = {name.strip().lower(): name for name in fieldnames or ()}
+    columns = {}
+    for column, aliases in _COLUMNS.items():
+        for alias in aliases:
+            if alias in found:
+                columns[column] = found[alias]
+                break
+    missing = {'admission_number', 'amount', 'date', 'reference'} - set(columns)
+    if missing:
+        raise PaymentImportError(f"Missing column(s): {', '.join(sorted(missing))}")
+    return columns
+
+
+def _parse_amount(value):
+    try:
+        amount = Decimal((value or '').replace(',', '').replace('₵', '').strip())
+    except InvalidOperation:
+        raise PaymentImportError(f"Invalid amount {value!r}")
+    # Decimal accepts NaN/Infinity, which cannot be compared or stored
+    if not amount.is_finite():
+        raise PaymentImportError(f"Invalid amount {value!r}")
+    if amount <= 0:
+        raise PaymentImportError(f"Amount must be positive, got {value!r}")
+    # Checked before quantize too, which fails outright on huge exponents
+    if amount > _MAX_AMOUNT or amount.quantize(Decimal('0.01')) > _MAX_AMOUNT:
+        raise PaymentImportError(f"Amount too large, got {value!r}")
+    return amount.quantize(Decimal('0.01'))
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise PaymentImportError(f"Invalid date {value!r}")
+
+
+def _read_rows(stream, columns):
+    """Yield ``(line, row)``; a file that is not readable CSV text raises PaymentImportError."""
+    reader = csv.DictReader(stream)
+    try:
+        columns.update(_column_map(reader.fieldnames))
+        for line, raw in enumerate(reader, start=2):
+            yield line, {column: (raw.get(name) or '').strip() for column, name in columns.items()}
+    except UnicodeDecodeError:
+        raise PaymentImportError("The statement is not UTF-8 text; save it as CSV UTF-8 and try again")
+    except csv.Error as exc:
+        raise PaymentImportError(f"Line {reader.line_num + 1}: {exc}")
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _FeeBook:
+    """Students' fees with the balance left after rows already imported."""
+
+    def __init__(self):
+        self.students = {}
+        self.fees = {}
+
+    def load(self, admission_numbers):
+        wanted = set(admission_numbers) - set(self.students)
+        if not wanted:
+            return
+        for student_id, admission_number in Student.objects.filter(
+            admission_number__in=wanted
+        ).values_list('id', 'admission_number'):
+            self.students[admission_number] = student_id
+            self.fees[student_id] = []
+        rows = StudentFee.objects.filter(
+            student_id__in=[self.students[a] for a in wanted if a in self.students]
+        ).values_list('id', 'student_id', 'fee_structure__head__name', 'fee_structure__due_date', 'balance')
+        for fee_id, student_id, head, due_date, balance in rows.order_by(
+            'fee_structure__due_date', 'id'
+        ):
+            self.fees[student_id].append({'id': fee_id, 'head': head.lower(), 'balance': balance})
+        for admission_number in wanted - set(self.students):
+            self.students[admission_number] = None
+
+    def allocate(self, admission_number, amount, head=''):
+        """Return the fee id ``amount`` should be booked against."""
+        student_id = self.students.get(admission_number)
+        if student_id is None:
+            raise PaymentImportError(f"Unknown admission number {admission_number!r}")
+        fees = self.fees[student_id]
+        if head:
+            fees = [fee for fee in fees if fee['head'] == head.lower()]
+            if not fees:
+                raise PaymentImportError(f"No {head!r} fee for {admission_number}")
+        if not fees:
+            raise PaymentImportError(f"No fees assigned to {admission_number}")
+        fee = next((fee for fee in fees if fee['balance'] > 0), fees[-1])
+        fee['balance'] -= amount
+        return fee['id']
+
+
+def import_payments(stream, user=None, method='Bank Transfer', dry_run=False, chunk_size=CHUNK_SIZE):
+    """Import payments from a CSV text stream.
+
+    Returns ``{'imported', 'duplicates', 'fees', 'errors'}`` where ``errors``
+    is a list of ``(line, message)``. With ``dry_run`` everything is
+    validated and counted but rolled back.
+    """
+    columns = {}
+    book = _FeeBook()
+    seen = set()
+    fee_ids = set()
+    payments = []
+    result = {'imported': 0, 'duplicates': 0, 'fees': 0, 'errors': []}
+
+    with transaction.atomic():
+        for chunk in _chunks(_read_rows(stream, columns), chunk_size):
+            book.load(row['admission_number'] for _line, row in chunk)
+            existing = set(Payment.objects.filter(
+                reference__in={row['reference'] for _line, row in chunk if row['reference']}
+            ).values_list('reference', flat=True))
+
+            batch = []
+            for line, row in chunk:
+                try:
+                    if not row['reference']:
+                        raise PaymentImportError("Missing reference")
+                    if row['reference'] in existing or row['reference'] in seen:
+                        result['duplicates'] += 1
+                        continue
+                    amount = _parse_amount(row['amount'])
+                    paid_on = _parse_date(row['date'])
+                    row_method = _METHODS.get(row.get('method', '').lower(), method)
+                    fee_id = book.allocate(row['admission_number'], amount, row.get('fee', ''))
+                except PaymentImportError as exc:
+                    result['errors'].append((line, str(exc)))
+                    continue
+                seen.add(row['reference'])
+                fee_ids.add(fee_id)
+                batch.append(Payment(
+                    student_fee_id=fee_id,
+                    amount=amount,
+                    date=paid_on,
+                    reference=row['reference'],
+                    method=row_method,
+                    recorded_by=user,
+                    remarks='Imported from statement',
+                ))
+            Payment.objects.bulk_create(batch, batch_size=500)
+            payments.extend(batch)
+
+        # bulk_create skips Payment.save(): settle ledgers, cube and caches once
+        recompute_ledgers(fee_ids)
+        post_payments(payments)
+        invalidate_family_fees(student_ids=StudentFee.objects.filter(
+            pk__in=fee_ids
+        ).values_list('student_id', flat=True))
+
+        result['imported'] = len(payments)
+        result['fees'] = len(fee_ids)
+        if dry_run:
+            transaction.set_rollback(True)
+    return result
@@ -0,0 +1,99 @@
+"""
+Stored paid/balance ledger for StudentFee.
+
+``StudentFee.amount_paid`` and ``balance`` are maintained in the database
+with ``F()`` updates whenever a Payment is created, changed or deleted, so
+concurrent payments against the same fee cannot overwrite each other and fee
+listings read plain columns instead of summing payments per fee.
+
+``reconcile_ledgers`` recomputes the columns from Payment rows and reports any
+drift (e.g. after raw SQL edits or bulk deletes that bypassed the signals).
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual
+
+from finance.family import invalidate_family_fees
+from finance.models import Payment, StudentFee
+
+ZERO = Decimal('0.00')
+
+
+def status_expression(paid):
+    """SQL expression giving the StudentFee status for a paid amount."""
+    return Case(
+        When(GreaterThanOrEqual(paid, F('amount_payable')), then=Value('paid')),
+        When(GreaterThan(paid, Value(ZERO)), then=Value('partial')),
+        default=Value('unpaid'),
+    )
+
+
+def ledger_update(paid):
+    """Column updates for ``StudentFee.objects.update()`` setting amount_paid to ``paid``.
+
+    Balance and status are derived from the same expression rather than from
+    the column, because most databases evaluate every SET clause against the
+    row as it was before the UPDATE.
+    """
+    return {
+        'amount_paid': paid,
+        'balance': F('amount_payable') - paid,
+        'status': status_expression(paid),
+    }
+
+
+def apply_payment_delta(student_fee_id, delta):
+    """Add ``delta`` (may be negative or zero) to a fee's paid amount."""
+    paid = F('amount_paid') + Value(Decimal(delta), output_field=DecimalField(max_digits=10, decimal_places=2))
+    return StudentFee.objects.filter(pk=student_fee_id).update(**ledger_update(paid))
+
+
+def _payments_total():
+    return Coalesce(
+        Subquery(
+            Payment.objects.filter(student_fee=OuterRef('pk'))
+            .order_by().values('student_fee').annotate(total=Sum('amount')).values('total')
+        ),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def ledger_drift(fees=None):
+    """Fees whose stored columns disagree with their Payment rows.
+
+    Returns a list of ``(fee_id, stored_paid, actual_paid, stored_balance,
+    actual_balance)``.
+    """
+    fees = StudentFee.objects.all() if fees is None else fees
+    rows = fees.annotate(actual_paid=_payments_total()).values_list(
+        'id', 'amount_paid', 'actual_paid', 'balance', 'amount_payable', 'status',
+    )
+    drift = []
+    for fee_id, paid, actual, balance, payable, status in rows.iterator():
+        actual = Decimal(str(actual)).quantize(ZERO)
+        expected_status = 'paid' if actual >= payable else 'partial' if actual > 0 else 'unpaid'
+        if paid != actual or balance != payable - actual or status != expected_status:
+            drift.append((fee_id, paid, actual, balance, payable - actual))
+    return drift
+
+
+def recompute_ledgers(fee_ids):
+    """Set amount_paid/balance/status of ``fee_ids`` from their payments in one UPDATE."""
+    if not fee_ids:
+        return 0
+    return StudentFee.objects.filter(pk__in=fee_ids).update(**ledger_update(_payments_total()))
+
+
+def reconcile_ledgers(fees=None, dry_run=False):
+    """Recompute amount_paid/balance/status from payments; return the drift found."""
+    drift = ledger_drift(fees)
+    if drift and not dry_run:
+        fee_ids = [row[0] for row in drift]
+        recompute_ledgers(fee_ids)
+        invalidate_family_fees(student_ids=StudentFee.objects.filter(
+            pk__in=fee_ids
+        ).values_list('student_id', flat=True))
+    return drift
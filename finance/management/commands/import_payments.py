@@ -0,0 +1,36 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.importers import PaymentImportError, import_payments
+
+
+class Command(BaseCommand):
+    help = "Import payments from a bank or mobile-money CSV statement"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path to the statement CSV')
+        parser.add_argument('--method', default='Bank Transfer', help='Payment method for rows without one')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without saving')
+
+    def handle(self, *args, **options):
+        path = Path(options['csv_path'])
+        if not path.is_absolute():
+            path = Path(os.getcwd()) / path
+        if not path.exists():
+            raise CommandError(f"CSV not found at {path}")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                result = import_payments(stream, method=options['method'], dry_run=options['dry_run'])
+        except PaymentImportError as exc:
+            raise CommandError(str(exc))
+
+        for line, message in result['errors']:
+            self.stderr.write(f"Line {line}: {message}")
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['imported']} payments against {result['fees']} fees "
+            f"({result['duplicates']} duplicates skipped, {len(result['errors'])} errors)"
+        ))
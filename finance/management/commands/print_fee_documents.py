@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from academics.models import Class
+from finance.printing import (
+    iter_receipts_html, iter_statements_html, receipt_payments, statement_students, write_statements_zip,
+)
+
+
+class Command(BaseCommand):
+    help = "Render payment receipts or fee statements in bulk as print-ready HTML"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['receipts', 'statements'])
+        parser.add_argument('output', help='File to write (.html, or .zip for one statement per student)')
+        parser.add_argument('--from', dest='date_from', help='Receipts: first payment date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Receipts: last payment date (YYYY-MM-DD)')
+        parser.add_argument('--class', dest='class_name', help='Only students in this class (current academic year)')
+
+    def _date(self, value):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"Invalid date: {value}")
+        return parsed
+
+    def handle(self, *args, **options):
+        class_id = None
+        if options['class_name']:
+            class_obj = Class.objects.filter(
+                name=options['class_name'], academic_year__is_current=True
+            ).first()
+            if class_obj is None:
+                raise CommandError(f"Class not found: {options['class_name']}")
+            class_id = class_obj.id
+
+        output = Path(options['output'])
+        if options['kind'] == 'receipts':
+            if output.suffix == '.zip':
+                raise CommandError("Receipts are written as one merged .html file")
+            documents = receipt_payments(self._date(options['date_from']), self._date(options['date_to']), class_id)
+            chunks = iter_receipts_html(documents)
+        else:
+            students = statement_students(class_id)
+            if output.suffix == '.zip':
+                count = write_statements_zip(output, students)
+                self.stdout.write(self.style.SUCCESS(f"Wrote {count} statements to {output}"))
+                return
+            chunks = iter_statements_html(students)
+
+        with open(output, 'w', encoding='utf-8') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['kind']} to {output}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from finance.analytics import rebuild_facts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the finance analytics fact table from StudentFee and Payment rows"
+
+    def handle(self, *args, **options):
+        count = rebuild_facts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} finance fact rows"))
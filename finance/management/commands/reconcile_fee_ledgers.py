@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finance.ledger import reconcile_ledgers
+
+
+class Command(BaseCommand):
+    help = "Recompute StudentFee paid/balance/status from Payment rows and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = reconcile_ledgers(dry_run=options['dry_run'])
+
+        for fee_id, paid, actual, balance, expected_balance in drift:
+            self.stdout.write(
+                f"StudentFee {fee_id}: paid {paid} -> {actual}, balance {balance} -> {expected_balance}"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All fee ledgers match their payments"))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} fees out of step (not fixed)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} fees"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from academics.models import AcademicYear
+from finance.assignment import assign_structures, rollover_structures
+from finance.models import TERM_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Copy one term's fee structures to another term and assign them to every student"
+
+    def add_arguments(self, parser):
+        terms = [value for value, _label in TERM_CHOICES]
+        parser.add_argument('--from-term', required=True, choices=terms)
+        parser.add_argument('--to-term', required=True, choices=terms)
+        parser.add_argument('--from-year', help='Academic year name (default: current year)')
+        parser.add_argument('--to-year', help='Academic year name (default: current year)')
+        parser.add_argument('--no-assign', action='store_true',
+                            help='Only create the fee structures, do not bill students')
+
+    def _year(self, name):
+        years = AcademicYear.objects.filter(name=name) if name else AcademicYear.objects.filter(is_current=True)
+        year = years.first()
+        if year is None:
+            raise CommandError(f"Academic year not found: {name or 'current'}")
+        return year
+
+    def handle(self, *args, **options):
+        from_year = self._year(options['from_year'])
+        to_year = self._year(options['to_year'])
+        if from_year.pk == to_year.pk and options['from_term'] == options['to_term']:
+            raise CommandError("Source and target term are the same")
+
+        with transaction.atomic():
+            structures = rollover_structures(from_year, options['from_term'], to_year, options['to_term'])
+            assigned = 0 if options['no_assign'] else assign_structures(structures)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(structures)} fee structures in {to_year} ({options['to_term']} term); "
+            f"{assigned} student fees assigned"
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-18 06:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_ledger(apps, schema_editor):
+    StudentFee = apps.get_model('finance', 'StudentFee')
+    Payment = apps.get_model('finance', 'Payment')
+
+    paid = Coalesce(
+        Subquery(
+            Payment.objects.filter(student_fee=OuterRef('pk'))
+            .order_by().values('student_fee').annotate(total=Sum('amount')).values('total')
+        ),
+        Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+    StudentFee.objects.update(amount_paid=paid)
+    StudentFee.objects.update(
+        balance=F('amount_payable') - F('amount_paid'),
+        status=Case(
+            When(amount_paid__gte=F('amount_payable'), then=Value('paid')),
+            When(amount_paid__gt=0, then=Value('partial')),
+            default=Value('unpaid'),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfee',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='studentfee',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0 on 2026-10-18 06:24
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+KEY_FIELDS = ('academic_year_id', 'term', 'school_class_id', 'fee_head_id', 'date')
+STRUCTURE = ('fee_structure__academic_year_id', 'fee_structure__term',
+             'fee_structure__class_level_id', 'fee_structure__head_id')
+
+
+def fill_facts(apps, schema_editor):
+    StudentFee = apps.get_model('finance', 'StudentFee')
+    Payment = apps.get_model('finance', 'Payment')
+    FeeCollectionFact = apps.get_model('finance', 'FeeCollectionFact')
+
+    totals = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+    receivables = StudentFee.objects.annotate(day=TruncDate('created_at')).values(
+        *STRUCTURE, 'day'
+    ).annotate(total=Sum('amount_payable')).order_by()
+    for row in receivables:
+        totals[tuple(row[f] for f in STRUCTURE) + (row['day'],)][0] += row['total']
+
+    payment_structure = tuple(f'student_fee__{f}' for f in STRUCTURE)
+    collections = Payment.objects.values(*payment_structure, 'date').annotate(total=Sum('amount')).order_by()
+    for row in collections:
+        totals[tuple(row[f] for f in payment_structure) + (row['date'],)][1] += row['total']
+
+    FeeCollectionFact.objects.bulk_create([
+        FeeCollectionFact(receivable=receivable, collected=collected,
+                          outstanding=receivable - collected, **dict(zip(KEY_FIELDS, key)))
+        for key, (receivable, collected) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_resource_curriculum_and_type'),
+        ('finance', '0002_studentfee_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeCollectionFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(choices=[('first', 'First Term'), ('second', 'Second Term'), ('third', 'Third Term')], max_length=20)),
+                ('date', models.DateField()),
+                ('receivable', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academics.academicyear')),
+                ('fee_head', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finance.feehead')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academics.class')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='finance_fee_date_c8c4e9_idx')],
+                'unique_together': {('academic_year', 'term', 'school_class', 'fee_head', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_feecollectionfact'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='reference',
+            field=models.CharField(blank=True, db_index=True, help_text='Receipt number or Transaction ID', max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_payment_reference_index'),
+        ('students', '0008_student_attendance_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentfee',
+            index=models.Index(fields=['balance', 'student'], name='finance_stu_balance_77d61b_idx'),
+        ),
+    ]
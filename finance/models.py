@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from students.models import Student
 from academics.models import Class, AcademicYear
 from accounts.models import User
@@ -51,32 +51,59 @@ class StudentFee(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='fees')
     fee_structure = models.ForeignKey(FeeStructure, on_delete=models.CASCADE)
     amount_payable = models.DecimalField(max_digits=10, decimal_places=2, help_text="Can be adjusted for scholarships")
+    # Maintained from Payment rows by finance.ledger; never edit directly
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unpaid')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Owned by the payment ledger: a plain save() must not write back a stale copy
+    LEDGER_FIELDS = ('amount_paid', 'balance', 'status')
+
     class Meta:
         unique_together = ('student', 'fee_structure')
+        # Defaulters report: owing rows only, grouped per student
+        indexes = [models.Index(fields=['balance', 'student'])]
 
     def __str__(self):
         return f"{self.student} - {self.fee_structure.head.name}"
 
     @property
     def total_paid(self):
-        return sum(payment.amount for payment in self.payments.all())
+        return self.amount_paid
 
-    @property
-    def balance(self):
-        return self.amount_payable - self.total_paid
+    def save(self, *args, **kwargs):
+        from finance.analytics import post_fee
+
+        if self._state.adding:
+            self.balance = self.amount_payable - self.amount_paid
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                post_fee(self.fee_structure_id, self.created_at, self.amount_payable)
+            return
+
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.LEDGER_FIELDS
+            ]
+        with transaction.atomic():
+            previous = StudentFee.objects.filter(pk=self.pk).values(
+                'fee_structure_id', 'amount_payable'
+            ).first()
+            super().save(*args, **kwargs)
+            if previous:
+                post_fee(previous['fee_structure_id'], self.created_at, -previous['amount_payable'])
+            post_fee(self.fee_structure_id, self.created_at, self.amount_payable)
+        # amount_payable may have changed; re-derive balance and status
+        self.update_status()
 
     def update_status(self):
-        paid = self.total_paid
-        if paid >= self.amount_payable:
-            self.status = 'paid'
-        elif paid > 0:
-            self.status = 'partial'
-        else:
-            self.status = 'unpaid'
-        self.save()
+        """Recompute balance and status from the stored amount_paid."""
+        from finance.ledger import apply_payment_delta
+
+        apply_payment_delta(self.pk, 0)
+        self.refresh_from_db(fields=self.LEDGER_FIELDS)
 
 class Payment(models.Model):
     """
@@ -85,7 +112,7 @@ class Payment(models.Model):
     student_fee = models.ForeignKey(StudentFee, on_delete=models.CASCADE, related_name='payments')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(default=timezone.now)
-    reference = models.CharField(max_length=100, blank=True, help_text="Receipt number or Transaction ID")
+    reference = models.CharField(max_length=100, blank=True, db_index=True, help_text="Receipt number or Transaction ID")
     method = models.CharField(max_length=50, default='Cash', choices=[('Cash', 'Cash'), ('Bank Transfer', 'Bank Transfer'), ('POS', 'POS')])
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     remarks = models.TextField(blank=True)
@@ -95,5 +122,43 @@ class Payment(models.Model):
         return f"{self.amount} - {self.date}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.student_fee.update_status()
+        from finance.analytics import post_payment
+        from finance.ledger import apply_payment_delta
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Payment.objects.filter(pk=self.pk).values('student_fee_id', 'amount', 'date').first()
+            super().save(*args, **kwargs)
+
+            if previous:
+                apply_payment_delta(previous['student_fee_id'], -previous['amount'])
+                post_payment(previous['student_fee_id'], previous['date'], -previous['amount'])
+            apply_payment_delta(self.student_fee_id, self.amount)
+            post_payment(self.student_fee_id, self.date, self.amount)
+
+        if Payment.student_fee.is_cached(self):
+            self.student_fee.refresh_from_db(fields=StudentFee.LEDGER_FIELDS)
+
+class FeeCollectionFact(models.Model):
+    """
+    Pre-aggregated fee totals per (academic year, term, class, fee head, date).
+    Receivable is booked on the day a fee is assigned and collected on the
+    payment date; outstanding is receivable minus collected. Kept current by
+    finance.analytics; rebuild with ``manage.py rebuild_finance_facts``.
+    """
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name='+')
+    term = models.CharField(max_length=20, choices=TERM_CHOICES)
+    school_class = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='+')
+    fee_head = models.ForeignKey(FeeHead, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    receivable = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('academic_year', 'term', 'school_class', 'fee_head', 'date')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
+        return f"{self.fee_head} - {self.school_class} - {self.date}"
@@ -0,0 +1,124 @@
+"""
+Batch receipts and fee statements.
+
+Month-end printing renders hundreds of receipts or statements at once, so
+this module is driven from ``manage.py print_fee_documents`` rather than a
+web request. The school header is rendered once per batch and passed to each
+card as ``school_header``; the card templates are loaded once and reused,
+and the payments/fees behind them come from a few bulk queries.
+
+Output is print-ready HTML (the project has no PDF renderer): either one
+merged document or a zip holding one statement file per student.
+"""
+import zipfile
+
+from django.db.models import Prefetch
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+
+from academics.utils import get_school_info
+from finance.models import Payment, StudentFee
+from students.models import Student
+
+
+def _render_header(school_info):
+    return mark_safe(get_template('finance/_school_header.html').render({'school_info': school_info}))
+
+
+def receipt_payments(date_from=None, date_to=None, class_id=None):
+    """Payments to print receipts for, with everything the card shows."""
+    payments = Payment.objects.select_related(
+        'student_fee__student__user',
+        'student_fee__student__current_class',
+        'student_fee__fee_structure__head',
+    ).order_by('date', 'id')
+    if date_from:
+        payments = payments.filter(date__gte=date_from)
+    if date_to:
+        payments = payments.filter(date__lte=date_to)
+    if class_id:
+        payments = payments.filter(student_fee__student__current_class_id=class_id)
+    return payments
+
+
+def statement_students(class_id=None, student_ids=None):
+    """Students to print statements for, with fees and payments prefetched."""
+    students = Student.objects.select_related('user', 'current_class').prefetch_related(
+        Prefetch(
+            'fees',
+            queryset=StudentFee.objects.select_related(
+                'fee_structure__head', 'fee_structure__academic_year',
+            ).prefetch_related(
+                Prefetch('payments', queryset=Payment.objects.order_by('date', 'id'))
+            ).order_by('fee_structure__academic_year__start_date', 'fee_structure__due_date', 'id'),
+        )
+    ).order_by('current_class__name', 'user__last_name', 'user__first_name')
+    if class_id:
+        students = students.filter(current_class_id=class_id)
+    if student_ids:
+        students = students.filter(id__in=student_ids)
+    return students
+
+
+def _statement_context(student):
+    fees = list(student.fees.all())
+    return {
+        'student': student,
+        'fees': fees,
+        'totals': {
+            'payable': sum(fee.amount_payable for fee in fees),
+            'paid': sum(fee.amount_paid for fee in fees),
+            'balance': sum(fee.balance for fee in fees),
+        },
+    }
+
+
+def iter_receipts_html(payments, school_info=None, request=None):
+    """Yield one merged HTML document holding a receipt per payment."""
+    school_info = school_info or get_school_info(request)
+    header = _render_header(school_info)
+    card = get_template('finance/_receipt_card.html')
+    payments = list(payments)
+
+    yield get_template('finance/print_batch_head.html').render({'title': 'Payment Receipts', 'count': len(payments)})
+    for payment in payments:
+        yield card.render({'payment': payment, 'school_info': school_info, 'school_header': header})
+    yield get_template('finance/print_batch_foot.html').render({})
+
+
+def iter_statements_html(students, school_info=None, request=None):
+    """Yield one merged HTML document holding a statement per student."""
+    school_info = school_info or get_school_info(request)
+    header = _render_header(school_info)
+    card = get_template('finance/_statement_card.html')
+    students = list(students)
+    generated_on = timezone.now()
+
+    yield get_template('finance/print_batch_head.html').render({'title': 'Fee Statements', 'count': len(students)})
+    for student in students:
+        context = _statement_context(student)
+        context.update(school_header=header, generated_on=generated_on)
+        yield card.render(context)
+    yield get_template('finance/print_batch_foot.html').render({})
+
+
+def write_statements_zip(target, students, school_info=None, request=None):
+    """Write one HTML statement per student into the zip file ``target``; return the count."""
+    school_info = school_info or get_school_info(request)
+    header = _render_header(school_info)
+    card = get_template('finance/_statement_card.html')
+    head = get_template('finance/print_batch_head.html').render({'title': 'Fee Statement', 'count': 1})
+    foot = get_template('finance/print_batch_foot.html').render({})
+    generated_on = timezone.now()
+
+    count = 0
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for student in students:
+            context = _statement_context(student)
+            context.update(school_header=header, generated_on=generated_on)
+            name = f"{student.admission_number}-{slugify(student.user.get_full_name()) or 'student'}.html"
+            archive.writestr(name, head + card.render(context) + foot)
+            count += 1
+    return count
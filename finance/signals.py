@@ -0,0 +1,48 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from finance.analytics import post_fee, post_payment
+from finance.family import invalidate_family_fees
+from finance.ledger import apply_payment_delta
+from finance.models import Payment, StudentFee
+from parents.models import Parent
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    """Drop the cached fee totals of the paying student's parents."""
+    invalidate_family_fees(student_ids=[instance.student_fee.student_id])
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    """Take a deleted payment off its fee's paid amount and the analytics cube."""
+    apply_payment_delta(instance.student_fee_id, -instance.amount)
+    post_payment(instance.student_fee_id, instance.date, -instance.amount)
+    invalidate_family_fees(student_ids=StudentFee.objects.filter(
+        pk=instance.student_fee_id
+    ).values_list('student_id', flat=True))
+
+
+@receiver(post_save, sender=StudentFee)
+def student_fee_saved(sender, instance, **kwargs):
+    invalidate_family_fees(student_ids=[instance.student_id])
+
+
+@receiver(post_delete, sender=StudentFee)
+def student_fee_deleted(sender, instance, **kwargs):
+    """Reverse a deleted fee's receivable in the analytics cube."""
+    post_fee(instance.fee_structure_id, instance.created_at, -instance.amount_payable)
+    invalidate_family_fees(student_ids=[instance.student_id])
+
+
+@receiver(m2m_changed, sender=Parent.children.through)
+def parent_children_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """A parent gaining or losing a child changes their family totals."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance is a Student; its parents are looked up before a clear
+        invalidate_family_fees(student_ids=[instance.pk], parent_ids=pk_set or ())
+    else:
+        invalidate_family_fees(parent_ids=[instance.pk])
@@ -5,9 +5,12 @@ app_name = 'finance'
 
 urlpatterns = [
     path('', views.finance_dashboard, name='dashboard'),
+    path('analytics/', views.finance_analytics, name='analytics'),
+    path('defaulters/', views.defaulters_report, name='defaulters'),
     path('manage/', views.manage_fees, name='manage_fees'),
     path('create-structure/', views.create_fee_structure, name='create_fee_structure'),
     path('student/<int:student_id>/', views.student_fees, name='student_fees'),
     path('payment/add/<int:fee_id>/', views.record_payment, name='record_payment'),
+    path('payment/import/', views.import_payment_statement, name='import_payments'),
     path('receipt/<int:payment_id>/', views.print_receipt, name='print_receipt'),
 ]
@@ -1,11 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import transaction
 from django.db.models import Sum, Q
+import io
 from .models import FeeHead, FeeStructure, StudentFee, Payment
-from .forms import FeeHeadForm, FeeStructureForm, PaymentForm
+from .analytics import DIMENSIONS, FILTERS, cube_rows
+from .assignment import assign_structures, copy_structure_to_classes
+from .defaulters import defaulters, iter_defaulters_csv
+from .forms import DefaultersFilterForm, FeeHeadForm, FeeStructureForm, PaymentForm, PaymentImportForm
+from .importers import PaymentImportError, import_payments
 from students.models import Student
-from academics.models import Class, AcademicYear, SchoolInfo
+from academics.models import Class, AcademicYear
+from academics.utils import get_school_info
 
 @login_required
 def finance_dashboard(request):
@@ -14,9 +24,12 @@ def finance_dashboard(request):
         return redirect('dashboard')
 
     # Quick Stats
-    total_receivable = StudentFee.objects.aggregate(Sum('amount_payable'))['amount_payable__sum'] or 0
-    total_collected = Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0
-    pending_amount = total_receivable - total_collected
+    totals = StudentFee.objects.aggregate(
+        receivable=Sum('amount_payable'), collected=Sum('amount_paid'), pending=Sum('balance')
+    )
+    total_receivable = totals['receivable'] or 0
+    total_collected = totals['collected'] or 0
+    pending_amount = totals['pending'] or 0
 
     recent_payments = Payment.objects.select_related('student_fee__student__user').order_by('-created_at')[:10]
     fee_structures = FeeStructure.objects.select_related('head', 'class_level').order_by('-id')[:5]
@@ -30,6 +43,26 @@ def finance_dashboard(request):
     }
     return render(request, 'finance/dashboard.html', context)
 
+@login_required
+def finance_analytics(request):
+    """Drill-down totals for the dashboard chart, read from the fact table."""
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'Access Denied'}, status=403)
+
+    dimension = request.GET.get('dimension', 'year')
+    if dimension not in DIMENSIONS:
+        return JsonResponse({'error': 'Unknown dimension'}, status=400)
+    filters = {name: request.GET[name] for name in FILTERS if request.GET.get(name)}
+
+    try:
+        rows = cube_rows(dimension, filters)
+    except (ValueError, ValidationError):
+        return JsonResponse({'error': 'Invalid filter'}, status=400)
+    for row in rows:
+        for field in ('receivable', 'collected', 'outstanding'):
+            row[field] = float(row[field])
+    return JsonResponse({'dimension': dimension, 'next': DIMENSIONS[dimension][2], 'rows': rows})
+
 @login_required
 def manage_fees(request):
     if request.user.user_type != 'admin':
@@ -62,25 +95,19 @@ def create_fee_structure(request):
     if request.method == 'POST':
         form = FeeStructureForm(request.POST)
         if form.is_valid():
-            structure = form.save()
-            
-            # Auto-assign to existing students?
-            assign_now = request.POST.get('assign_now') == 'on'
+            with transaction.atomic():
+                structure = form.save()
+                structures = copy_structure_to_classes(structure, form.target_classes())
+
+                # Auto-assign to existing students?
+                assign_now = request.POST.get('assign_now') == 'on'
+                count = assign_structures(structures) if assign_now else 0
+
+            label = 'Fee Structure' if len(structures) == 1 else f'{len(structures)} Fee Structures'
             if assign_now:
-                students = Student.objects.filter(current_class=structure.class_level)
-                count = 0
-                for student in students:
-                    # Check if already exists
-                    if not StudentFee.objects.filter(student=student, fee_structure=structure).exists():
-                        StudentFee.objects.create(
-                            student=student,
-                            fee_structure=structure,
-                            amount_payable=structure.amount
-                        )
-                        count += 1
-                messages.success(request, f'Fee Structure created and assigned to {count} students.')
+                messages.success(request, f'{label} created and assigned to {count} students.')
             else:
-                messages.success(request, 'Fee Structure created.')
+                messages.success(request, f'{label} created.')
             return redirect('finance:manage_fees')
     else:
         form = FeeStructureForm()
@@ -103,13 +130,15 @@ def student_fees(request, student_id):
         messages.error(request, "Access Denied. Only Admins or Class Teachers can view fees.")
         return redirect('dashboard')
 
-    fees = StudentFee.objects.filter(student=student).select_related('fee_structure', 'fee_structure__head')
+    fees = StudentFee.objects.filter(student=student).select_related(
+        'fee_structure', 'fee_structure__head', 'fee_structure__academic_year'
+    ).prefetch_related('payments')
     
     processed_fees = []
     for fee in fees:
         processed_fees.append({
             'obj': fee,
-            'paid': fee.total_paid,
+            'paid': fee.amount_paid,
             'balance': fee.balance
         })
 
@@ -139,9 +168,73 @@ def record_payment(request, fee_id):
 
     return render(request, 'finance/payment_form.html', {'form': form, 'fee': fee})
 
+@login_required
+def import_payment_statement(request):
+    if request.user.user_type != 'admin':
+        return redirect('dashboard')
+
+    result = None
+    if request.method == 'POST':
+        form = PaymentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            stream = io.TextIOWrapper(form.cleaned_data['statement'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_payments(
+                    stream,
+                    user=request.user,
+                    method=form.cleaned_data['method'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except PaymentImportError as exc:
+                messages.error(request, f'Could not read statement: {exc}')
+            else:
+                verb = 'Checked' if form.cleaned_data['dry_run'] else 'Imported'
+                messages.success(
+                    request,
+                    f"{verb} {result['imported']} payments ({result['duplicates']} duplicates skipped)",
+                )
+    else:
+        form = PaymentImportForm()
+
+    return render(request, 'finance/import_payments.html', {'form': form, 'result': result})
+
+@login_required
+def defaulters_report(request):
+    if request.user.user_type != 'admin':
+        return redirect('dashboard')
+
+    form = DefaultersFilterForm(request.GET or None)
+    filters = form.cleaned_data if form.is_valid() else {}
+    rows = defaulters(
+        class_id=getattr(filters.get('school_class'), 'id', None),
+        term=filters.get('term'),
+        head_id=getattr(filters.get('head'), 'id', None),
+        min_balance=filters.get('min_balance'),
+    )
+
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(iter_defaulters_csv(rows), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="defaulters.csv"'
+        return response
+
+    page_obj = Paginator(rows, 50).get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    return render(request, 'finance/defaulters.html', {
+        'form': form,
+        'defaulters': page_obj,
+        'total_outstanding': rows.aggregate(total=Sum('outstanding'))['total'] or 0,
+        'query': query.urlencode(),
+    })
+
 @login_required
 def print_receipt(request, payment_id):
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(
+        Payment.objects.select_related(
+            'student_fee__student__user', 'student_fee__student__current_class', 'student_fee__fee_structure__head',
+        ),
+        id=payment_id,
+    )
     student = payment.student_fee.student
     
     # Permission check: Only Admin or Assigned Class Teacher
@@ -155,7 +248,7 @@ def print_receipt(request, payment_id):
     if not allowed:
         return redirect('dashboard')
     
-    school_info = SchoolInfo.objects.first()
+    school_info = get_school_info(request)
     
     return render(request, 'finance/receipt.html', {
         'payment': payment,
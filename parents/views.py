@@ -3,6 +3,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from parents.models import Parent, Homework
 from students.models import Student, Attendance, Grade
+from students.summaries import get_student_summary, summaries_for_students
+from finance.family import family_fee_summary
 
 @login_required
 def parent_children(request):
@@ -18,25 +20,21 @@ def parent_children(request):
     
     # Get all children with additional stats
     children = parent.children.all()
+    summaries = summaries_for_students(child.id for child in children)
+    family_fees = family_fee_summary(parent)
     children_data = []
     
     for child in children:
-        # Calculate attendance percentage
-        total_attendance = Attendance.objects.filter(student=child).count()
-        present_count = Attendance.objects.filter(student=child, status='present').count()
-        
-        attendance_percentage = 0
-        if total_attendance > 0:
-            attendance_percentage = round((present_count / total_attendance) * 100, 2)
-        
-        # Get grade count
-        grade_count = Grade.objects.filter(student=child).count()
-        
-        child.attendance_percentage = attendance_percentage
-        child.grade_count = grade_count
+        summary = summaries[child.id]
+        child.attendance_percentage = summary.attendance_stats()['percentage']
+        child.grade_count = summary.grade_count
+        child.fee_totals = family_fees['children'].get(child.id)
         children_data.append(child)
     
-    return render(request, 'parents/my_children.html', {'children': children_data})
+    return render(request, 'parents/my_children.html', {
+        'children': children_data,
+        'family_fees': family_fees,
+    })
 
 
 @login_required
@@ -61,30 +59,14 @@ def child_details(request, student_id):
     # Get attendance records
     attendances = Attendance.objects.filter(student=student).order_by('-date')[:30]
     
-    # Calculate attendance stats
-    total_attendance = Attendance.objects.filter(student=student).count()
-    present_count = Attendance.objects.filter(student=student, status='present').count()
-    absent_count = Attendance.objects.filter(student=student, status='absent').count()
-    
-    attendance_percentage = 0
-    if total_attendance > 0:
-        attendance_percentage = round((present_count / total_attendance) * 100, 2)
-    
-    attendance_stats = {
-        'present': present_count,
-        'absent': absent_count,
-        'total': total_attendance,
-        'percentage': attendance_percentage
-    }
+    # Attendance stats and average from the student's summary row
+    summary = get_student_summary(student)
+    student_attendance = summary.attendance_stats()
     
     # Get grades
     grades = Grade.objects.filter(student=student).select_related('subject').order_by('-created_at')
     
-    # Calculate average percentage
-    average_percentage = 0
-    if grades.exists():
-        total_percentage = sum([g.percentage() for g in grades])
-        average_percentage = round(total_percentage / grades.count(), 2)
+    average_percentage = float(summary.average_score)
     
     # Calculate overall grade
     if average_percentage >= 90:
@@ -108,11 +90,12 @@ def child_details(request, student_id):
     context = {
         'student': student,
         'attendances': attendances,
-        'attendance_stats': attendance_stats,
+        'attendance_stats': student_attendance,
         'grades': grades,
         'average_percentage': average_percentage,
         'overall_grade': overall_grade,
         'homework': homework,
+        'fee_totals': family_fee_summary(parent)['children'].get(student.id),
     }
     
     return render(request, 'parents/child_details.html', context)
\ No newline at end of file
@@ -111,6 +111,48 @@ else:
     }
 
 
+# =====================
+# CACHE
+# =====================
+# Cache invalidation (leaderboards, fee summaries, timetable/calendar
+# versions) must reach every worker, so production needs a shared default
+# backend: Redis when REDIS_URL is set, otherwise the database (table
+# created by `manage.py createcachetable` in build_files.sh). The default
+# cache is process-local memory only in local development.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'school-system',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+# Per-process memory for small values read on every page (school header,
+# notification bell). Other workers do not see invalidations here, so
+# entries use short timeouts; a database-backed cache would cost as much as
+# the query it replaces.
+CACHES['local'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'school-system-local',
+}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
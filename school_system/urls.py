@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
+from django.views.static import serve
 from accounts import views as account_views
 
 admin.site.site_header = "Daboya Girls Model JHS Administration"
@@ -12,6 +13,9 @@ admin.site.index_title = "Welcome to Girls Model JHS Management System"
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Served from the site root so the service worker's scope covers every page
+    path('sw.js', serve, {'path': 'sw.js', 'document_root': settings.BASE_DIR / 'static'},
+         name='service_worker'),
     path('home/', account_views.homepage, name='home'),
     path('', account_views.login_view, name='login'),
     path('logout/', account_views.logout_view, name='logout'),
@@ -11,6 +11,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'school_system.settings')
 django.setup()
 
 from academics.models import AcademicYear, Class, Subject, ClassSubject, Timetable
+from academics.timetabling import get_slot_grid
 from teachers.models import Teacher
 
 # Subject name mapping (Image Name -> Database Name)
@@ -29,117 +30,117 @@ SUBJECT_MAPPING = {
     "English/Library": "English Language", 
 }
 
-# Timetable Data from Image
+# Timetable Data from Image: one subject per lesson period of the bell schedule
 TIMETABLE_DATA = {
     "Basic 7": {
         "Monday": [
-            ("07:00", "08:40", "Maths"),
-            ("08:40", "09:50", "Career Technology"),
-            ("10:20", "11:30", "Science"),
-            ("11:30", "12:40", "Library"),
-            ("13:00", "14:00", "English"),
+            "Maths",
+            "Career Technology",
+            "Science",
+            "Library",
+            "English",
         ],
         "Tuesday": [
-            ("07:00", "08:40", "Computing"),
-            ("08:40", "09:50", "Maths"),
-            ("10:20", "11:30", "Creative Arts & Design"),
-            ("11:30", "12:40", "Career Technology"),
-            ("13:00", "14:00", "R.M.E."),
+            "Computing",
+            "Maths",
+            "Creative Arts & Design",
+            "Career Technology",
+            "R.M.E.",
         ],
         "Wednesday": [
-            ("07:00", "08:40", "English"),
-            ("08:40", "09:50", "Social Studies"),
-            ("10:20", "11:30", "Career Technology"),
-            ("11:30", "12:40", "Creative Arts & Design"),
-            ("13:00", "14:00", "Science"),
+            "English",
+            "Social Studies",
+            "Career Technology",
+            "Creative Arts & Design",
+            "Science",
         ],
         "Thursday": [
-            ("07:00", "08:40", "Science"),
-            ("08:40", "09:50", "Computing"),
-            ("10:20", "11:30", "Gonja"),
-            ("11:30", "12:40", "English"),
-            ("13:00", "14:00", "Social Studies"),
+            "Science",
+            "Computing",
+            "Gonja",
+            "English",
+            "Social Studies",
         ],
         "Friday": [
-            ("07:00", "08:40", "Maths"),
-            ("08:40", "09:50", "Social Studies"),
-            ("10:20", "11:30", "R.M.E."),
-            ("11:30", "12:40", "Physical & Health Education"),
-            ("13:00", "14:00", "Physical & Health Education"),
+            "Maths",
+            "Social Studies",
+            "R.M.E.",
+            "Physical & Health Education",
+            "Physical & Health Education",
         ]
     },
     "Basic 8": {
         "Monday": [
-            ("07:00", "08:40", "Science"),
-            ("08:40", "09:50", "Gonja"),
-            ("10:20", "11:30", "Career Technology"),
-            ("11:30", "12:40", "English"), # Simplified English/Library
-            ("13:00", "14:00", "Social Studies"),
+            "Science",
+            "Gonja",
+            "Career Technology",
+            "English", # Simplified English/Library
+            "Social Studies",
         ],
         "Tuesday": [
-            ("07:00", "08:40", "Social Studies"),
-            ("08:40", "09:50", "Career Technology"),
-            ("10:20", "11:30", "English"),
-            ("11:30", "12:40", "Computing"),
-            ("13:00", "14:00", "Creative Arts & Design"),
+            "Social Studies",
+            "Career Technology",
+            "English",
+            "Computing",
+            "Creative Arts & Design",
         ],
         "Wednesday": [
-            ("07:00", "08:40", "Creative Arts & Design"),
-            ("08:40", "09:50", "Science"),
-            ("10:20", "11:30", "Gonja"),
-            ("11:30", "12:40", "Maths"),
-            ("13:00", "14:00", "R.M.E."),
+            "Creative Arts & Design",
+            "Science",
+            "Gonja",
+            "Maths",
+            "R.M.E.",
         ],
         "Thursday": [
-            ("07:00", "08:40", "Maths"),
-            ("08:40", "09:50", "English"),
-            ("10:20", "11:30", "Social Studies"),
-            ("11:30", "12:40", "Computing"),
-            ("13:00", "14:00", "Science"),
+            "Maths",
+            "English",
+            "Social Studies",
+            "Computing",
+            "Science",
         ],
         "Friday": [
-            ("07:00", "08:40", "R.M.E."),
-            ("08:40", "09:50", "Maths"),
-            ("10:20", "11:30", "English"),
-            ("11:30", "12:40", "Physical & Health Education"),
-            ("13:00", "14:00", "Physical & Health Education"),
+            "R.M.E.",
+            "Maths",
+            "English",
+            "Physical & Health Education",
+            "Physical & Health Education",
         ]
     },
     "Basic 9": {
         "Monday": [
-            ("07:00", "08:40", "English"),
-            ("08:40", "09:50", "Social Studies"),
-            ("10:20", "11:30", "Maths"),
-            ("11:30", "12:40", "Library"),
-            ("13:00", "14:00", "Computing"),
+            "English",
+            "Social Studies",
+            "Maths",
+            "Library",
+            "Computing",
         ],
         "Tuesday": [
-            ("07:00", "08:40", "Science"),
-            ("08:40", "09:50", "Social Studies"),
-            ("10:20", "11:30", "Computing"),
-            ("11:30", "12:40", "Maths"),
-            ("13:00", "14:00", "English"),
+            "Science",
+            "Social Studies",
+            "Computing",
+            "Maths",
+            "English",
         ],
         "Wednesday": [
-            ("07:00", "08:40", "Maths"),
-            ("08:40", "09:50", "Career Technology"),
-            ("10:20", "11:30", "R.M.E."),
-            ("11:30", "12:40", "Science"),
-            ("13:00", "14:00", "Creative Arts & Design"),
+            "Maths",
+            "Career Technology",
+            "R.M.E.",
+            "Science",
+            "Creative Arts & Design",
         ],
         "Thursday": [
-            ("07:00", "08:40", "Social Studies"),
-            ("08:40", "09:50", "Career Technology"),
-            ("10:20", "11:30", "Science"),
-            ("11:30", "12:40", "R.M.E."),
-            ("13:00", "14:00", "Gonja"),
+            "Social Studies",
+            "Career Technology",
+            "Science",
+            "R.M.E.",
+            "Gonja",
         ],
         "Friday": [
-            ("07:00", "08:40", "Gonja"),
-            ("08:40", "09:50", "English"),
-            ("10:20", "11:30", "Creative Arts & Design"),
-            ("11:30", "12:40", "Physical & Health Education"),
-            ("13:00", "14:00", "Physical & Health Education"),
+            "Gonja",
+            "English",
+            "Creative Arts & Design",
+            "Physical & Health Education",
+            "Physical & Health Education",
         ]
     }
 }
@@ -170,6 +171,8 @@ def run():
         print(f"Error getting academic year: {e}")
         return
 
+    grid = get_slot_grid(academic_year)
+
     # 2. Ensure Subjects Exist
     print("Verifying subjects...")
     all_subject_names = set(SUBJECT_MAPPING.values())
@@ -205,7 +208,7 @@ def run():
         for day_name, lessons in schedule.items():
             day_idx = DAY_MAP[day_name]
             
-            for start, end, raw_subject in lessons:
+            for period, raw_subject in zip(grid.lessons, lessons):
                 db_subject_name = SUBJECT_MAPPING.get(raw_subject, raw_subject)
                 
                 # Get Subject Object
@@ -229,8 +232,8 @@ def run():
                 Timetable.objects.create(
                     class_subject=class_subject,
                     day=day_idx,
-                    start_time=datetime.datetime.strptime(start, "%H:%M").time(),
-                    end_time=datetime.datetime.strptime(end, "%H:%M").time()
+                    start_time=period.start_time,
+                    end_time=period.end_time
                 )
     
     print("\nTimetable update complete!")
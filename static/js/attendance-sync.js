@@ -0,0 +1,89 @@
+/*
+ * Offline attendance queue.
+ *
+ * Attendance submissions are written to IndexedDB first and then sent to
+ * /students/attendance/sync/ in one request. Anything that cannot be sent
+ * (no connection, server error) stays queued and is replayed when the page
+ * comes back online or the service worker gets a background sync event.
+ * Loaded by pages with <script> and by sw.js with importScripts().
+ */
+(function (global) {
+  const DB_NAME = 'school-offline';
+  const STORE = 'attendance-queue';
+  const SYNC_URL = '/students/attendance/sync/';
+  const SYNC_TAG = 'attendance-sync';
+
+  function openDb() {
+    return new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, 1);
+      request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'id' });
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+
+  function withStore(mode, callback) {
+    return openDb().then((db) => new Promise((resolve, reject) => {
+      const tx = db.transaction(STORE, mode);
+      const request = callback(tx.objectStore(STORE));
+      tx.oncomplete = () => resolve(request ? request.result : undefined);
+      tx.onerror = () => reject(tx.error);
+    }));
+  }
+
+  function newId() {
+    if (global.crypto && global.crypto.randomUUID) {
+      return global.crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+  }
+
+  function enqueue(submission, csrfToken) {
+    const entry = Object.assign({ id: newId(), queued_at: new Date().toISOString(), csrf: csrfToken }, submission);
+    return withStore('readwrite', (store) => store.put(entry)).then(() => entry);
+  }
+
+  function pending() {
+    return withStore('readonly', (store) => store.getAll());
+  }
+
+  // Send every queued submission in one request. Saved and rejected entries
+  // leave the queue; on network or server errors everything stays queued.
+  function flush(csrfToken) {
+    return pending().then((entries) => {
+      if (!entries.length) {
+        return { results: [], remaining: 0 };
+      }
+      // The service worker cannot read cookies, so fall back to the token
+      // captured when the newest entry was queued.
+      const token = csrfToken || entries[entries.length - 1].csrf;
+      const submissions = entries.map(({ csrf, ...submission }) => submission);
+
+      return fetch(SYNC_URL, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': token },
+        // sent_at lets the server correct queued_at for this device's clock
+        body: JSON.stringify({ sent_at: new Date().toISOString(), submissions: submissions }),
+      })
+        .then((response) => {
+          if (!response.ok) throw new Error('Sync failed with status ' + response.status);
+          return response.json();
+        })
+        .then((data) => {
+          const done = data.results.map((result) => result.id);
+          return withStore('readwrite', (store) => { done.forEach((id) => store.delete(id)); })
+            .then(() => ({ results: data.results, remaining: entries.length - done.length }));
+        });
+    });
+  }
+
+  function requestBackgroundSync() {
+    if (!('serviceWorker' in navigator)) return Promise.resolve();
+    return navigator.serviceWorker.ready
+      .then((registration) => registration.sync && registration.sync.register(SYNC_TAG))
+      .catch(() => {});
+  }
+
+  global.AttendanceQueue = { enqueue, pending, flush, requestBackgroundSync, SYNC_TAG };
+})(self);
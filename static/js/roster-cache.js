@@ -0,0 +1,42 @@
+/*
+ * Client for the compact roster endpoints (students/rosters.py).
+ *
+ * Keeps the last roster per URL for the life of the page. Reloading the same
+ * roster asks only for rows changed since that version; the browser cache
+ * handles ETag revalidation (304) on top of that.
+ */
+(function (global) {
+  const rosters = new Map();
+
+  function toObjects(columns, rows) {
+    return rows.map((row) => {
+      const record = {};
+      columns.forEach((column, index) => { record[column] = row[index]; });
+      return record;
+    });
+  }
+
+  function load(url) {
+    const cached = rosters.get(url);
+    const requestUrl = cached ? `${url}${url.includes('?') ? '&' : '?'}since=${cached.version}` : url;
+
+    return fetch(requestUrl, { credentials: 'same-origin' })
+      .then((response) => response.json().catch(() => ({})).then((payload) => {
+        if (!response.ok) throw new Error(payload.error || 'Network response was not ok');
+        return payload;
+      }))
+      .then((payload) => {
+        let rows = payload.rows;
+        if (payload.delta) {
+          // Merge changed rows into what we already have, in roster order
+          const byId = new Map((cached ? cached.rows : []).map((row) => [row[0], row]));
+          payload.rows.forEach((row) => byId.set(row[0], row));
+          rows = payload.ids.map((id) => byId.get(id)).filter(Boolean);
+        }
+        rosters.set(url, { version: payload.version, rows: rows });
+        return toObjects(payload.columns, rows);
+      });
+  }
+
+  global.RosterCache = { load };
+})(window);
@@ -1,12 +1,23 @@
-const CACHE_NAME = 'school-app-v1';
+importScripts('/static/js/attendance-sync.js');
+
+const CACHE_NAME = 'school-app-v4';
+const DATA_CACHE_NAME = 'school-data-v1';
 const ASSETS_TO_CACHE = [
   '/static/css/style.css', // Assuming main css
   '/static/img/logo.png',
+  '/static/js/attendance-sync.js',
+  '/static/js/roster-cache.js',
   'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
   'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css',
   'https://manrope.fontsource.org' // Or google fonts if possible
 ];
 
+// Pages and JSON the attendance register needs when the connection drops
+const OFFLINE_PATHS = [
+  '/students/attendance/mark/',
+  '/students/get-class-students/',
+];
+
 self.addEventListener('install', (event) => {
   event.waitUntil(
     caches.open(CACHE_NAME).then((cache) => {
@@ -17,7 +28,38 @@ self.addEventListener('install', (event) => {
   );
 });
 
+self.addEventListener('activate', (event) => {
+  event.waitUntil(
+    caches.keys().then((names) => Promise.all(
+      names.filter((name) => name !== CACHE_NAME && name !== DATA_CACHE_NAME)
+           .map((name) => caches.delete(name))
+    ))
+  );
+});
+
+// Network first; keep a copy for offline use and fall back to it (ignoring
+// the ?date= query, so a roster cached on another day still loads). Delta
+// rosters (?since=) are partial, so they are never stored.
+function networkFirst(request) {
+  const storable = !new URL(request.url).searchParams.has('since');
+  return caches.open(DATA_CACHE_NAME).then((cache) => {
+    return fetch(request)
+      .then((response) => {
+        if (response.ok && storable) cache.put(request, response.clone());
+        return response;
+      })
+      .catch(() => cache.match(request).then((cached) => {
+        return cached || cache.match(request, { ignoreSearch: true }).then((fallback) => {
+          if (fallback) return fallback;
+          throw new Error('Offline and not cached: ' + request.url);
+        });
+      }));
+  });
+}
+
 self.addEventListener('fetch', (event) => {
+  const url = new URL(event.request.url);
+
   // Simple cache-first strategy for static assets, network-first for pages
   if (event.request.url.includes('/static/') || event.request.url.includes('cdn.')) {
       event.respondWith(
@@ -25,8 +67,18 @@ self.addEventListener('fetch', (event) => {
           return response || fetch(event.request);
         })
       );
+  } else if (event.request.method === 'GET' && url.origin === self.location.origin &&
+             OFFLINE_PATHS.some((path) => url.pathname.startsWith(path))) {
+      event.respondWith(networkFirst(event.request));
   } else {
       // For navigation (pages), try network, fall back to nothing (or offline page if we had one)
       event.respondWith(fetch(event.request));
   }
 });
+
+// Replay queued attendance once the browser reports connectivity again
+self.addEventListener('sync', (event) => {
+  if (event.tag === self.AttendanceQueue.SYNC_TAG) {
+    event.waitUntil(self.AttendanceQueue.flush());
+  }
+});
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
-    verbose_name = '🎓 Student Management'
\ No newline at end of file
+    verbose_name = '🎓 Student Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Batch attendance marking for one class on one date.
+
+``save_attendance_batch`` replaces a lookup plus ``update_or_create`` per
+student: the roster is checked with one query and every row is written with a
+single upsert (``bulk_create(update_conflicts=True)``) inside one transaction.
+Backends without ON CONFLICT support load the day's existing rows with one
+query and fall back to bulk_create/bulk_update.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from students.models import Attendance, Student
+from students.summaries import queue_summary_refresh
+
+_STATUSES = dict(Attendance.STATUS_CHOICES)
+
+
+def save_attendance_batch(class_obj, date, statuses, user=None):
+    """Upsert attendance for ``class_obj`` on ``date`` and return how many rows were saved.
+
+    ``statuses`` is an iterable of ``(student_id, status)``. Students who are
+    not in the class and unknown statuses are ignored; if a student appears
+    more than once the last row wins.
+    """
+    marks = {}
+    for student_id, status in statuses:
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            continue
+        if status in _STATUSES:
+            marks[student_id] = status
+    if not marks:
+        return 0
+
+    with transaction.atomic():
+        enrolled = set(Student.objects.filter(
+            current_class=class_obj, id__in=marks.keys()
+        ).values_list('id', flat=True))
+        if not enrolled:
+            return 0
+
+        if connection.features.supports_update_conflicts_with_target:
+            Attendance.objects.bulk_create(
+                [Attendance(student_id=student_id, date=date, status=marks[student_id], marked_by=user)
+                 for student_id in enrolled],
+                update_conflicts=True,
+                unique_fields=['student', 'date'],
+                update_fields=['status', 'marked_by', 'updated_at'],
+                batch_size=500,
+            )
+        else:
+            existing = {
+                a.student_id: a for a in Attendance.objects.filter(student_id__in=enrolled, date=date)
+            }
+            now = timezone.now()
+            to_create, to_update = [], []
+            for student_id in enrolled:
+                record = existing.get(student_id)
+                if record is None:
+                    to_create.append(Attendance(student_id=student_id, date=date,
+                                                status=marks[student_id], marked_by=user))
+                else:
+                    record.status = marks[student_id]
+                    record.marked_by = user
+                    record.updated_at = now
+                    to_update.append(record)
+            if to_create:
+                Attendance.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Attendance.objects.bulk_update(to_update, ['status', 'marked_by', 'updated_at'],
+                                               batch_size=500)
+
+        # bulk writes skip post_save, so refresh the student summaries here
+        queue_summary_refresh(attendance=enrolled)
+
+    return len(enrolled)
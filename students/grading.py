@@ -0,0 +1,121 @@
+"""
+Batch grade entry for one ClassSubject/term.
+
+``save_grade_batch`` replaces per-student ``update_or_create`` calls: the class
+roster and the existing Grade rows are each loaded with one query, results are
+computed in memory and written with bulk_create/bulk_update inside a single
+transaction, and the subject ranking runs once at the end. The number of
+queries does not grow with the size of the class.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from students.models import Grade, Student
+from students.ranking import rank_groups, ranking_key
+from students.summaries import queue_summary_refresh
+from students.utils import invalidate_class_leaderboard
+
+CLASS_SCORE_MAX = Decimal('30')
+EXAMS_SCORE_MAX = Decimal('70')
+
+_UPDATE_FIELDS = ['class_score', 'exams_score', 'total_score', 'grade', 'remarks',
+                  'created_by', 'updated_at']
+
+
+def _clamp(value, maximum):
+    return max(Decimal('0'), min(value, maximum))
+
+
+def clean_score_row(class_score_raw, exams_score_raw, overall_raw=None):
+    """Turn raw form values into clamped (class_score, exams_score).
+
+    Explicit class/exam fields win; otherwise an overall mark out of 100 is
+    split 30/70. Returns None when the row is empty or not numeric.
+    """
+    try:
+        if class_score_raw not in (None, '') and exams_score_raw not in (None, ''):
+            class_score = Decimal(class_score_raw)
+            exams_score = Decimal(exams_score_raw)
+        elif overall_raw not in (None, ''):
+            overall = _clamp(Decimal(overall_raw), Decimal('100'))
+            class_score = overall * Decimal('0.3')
+            exams_score = overall * Decimal('0.7')
+        else:
+            return None
+    except (InvalidOperation, TypeError):
+        return None
+
+    if not (class_score.is_finite() and exams_score.is_finite()):
+        return None
+    return _clamp(class_score, CLASS_SCORE_MAX), _clamp(exams_score, EXAMS_SCORE_MAX)
+
+
+def save_grade_batch(class_subject, academic_year, term, rows, user=None):
+    """Upsert grades for ``class_subject`` and return how many rows were saved.
+
+    ``rows`` is an iterable of ``(student_id, class_score, exams_score)``.
+    Students who are not in the class are ignored; if a student appears more
+    than once the last row wins.
+    """
+    scores = {}
+    for student_id, class_score, exams_score in rows:
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            continue
+        scores[student_id] = (_clamp(class_score, CLASS_SCORE_MAX),
+                              _clamp(exams_score, EXAMS_SCORE_MAX))
+    if not scores:
+        return 0
+
+    class_id = class_subject.class_name_id
+    with transaction.atomic():
+        enrolled = set(Student.objects.filter(
+            current_class_id=class_id, id__in=scores.keys()
+        ).values_list('id', flat=True))
+
+        existing = {
+            g.student_id: g for g in Grade.objects.filter(
+                student_id__in=enrolled,
+                subject_id=class_subject.subject_id,
+                academic_year=academic_year,
+                term=term,
+            )
+        }
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for student_id in enrolled:
+            class_score, exams_score = scores[student_id]
+            grade = existing.get(student_id)
+            if grade is None:
+                grade = Grade(
+                    student_id=student_id,
+                    subject_id=class_subject.subject_id,
+                    academic_year=academic_year,
+                    term=term,
+                )
+                to_create.append(grade)
+            else:
+                grade.updated_at = now
+                to_update.append(grade)
+            grade.class_score = class_score
+            grade.exams_score = exams_score
+            grade.created_by = user
+            grade.calculate_result()
+
+        if to_create:
+            Grade.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            Grade.objects.bulk_update(to_update, _UPDATE_FIELDS, batch_size=500)
+
+        rank_groups([ranking_key(class_subject.subject_id, academic_year.id, term, class_id)])
+
+    # bulk writes skip post_save, so drop the cached leaderboard and refresh
+    # the student summaries here
+    invalidate_class_leaderboard(class_id, academic_year.id, term)
+    queue_summary_refresh(grades=enrolled, positions=[(class_id, academic_year.id, term)])
+
+    return len(enrolled)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from students.summaries import rebuild_student_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StudentSummary table from Attendance and Grade rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', dest='student_ids', type=int, action='append',
+                            help='Only rebuild this student id (repeatable)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_student_summaries(options['student_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt summaries for {count} students"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-18 06:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_resource_curriculum_and_type'),
+        ('students', '0005_classexercise_studentexercisescore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(choices=[('first', 'First Term'), ('second', 'Second Term'), ('third', 'Third Term')], max_length=10)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('html', models.TextField()),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='academics.academicyear')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='students.student')),
+            ],
+            options={
+                'unique_together': {('student', 'academic_year', 'term')},
+            },
+        ),
+    ]
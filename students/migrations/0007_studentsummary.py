@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-18 06:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_reportcard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('excused_count', models.PositiveIntegerField(default=0)),
+                ('attendance_total', models.PositiveIntegerField(default=0)),
+                ('grade_count', models.PositiveIntegerField(default=0)),
+                ('average_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('class_positions', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='students.student')),
+            ],
+        ),
+    ]
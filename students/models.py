@@ -18,6 +18,7 @@ class Student(models.Model):
     roll_number = models.CharField(max_length=10, blank=True)
     blood_group = models.CharField(max_length=5, blank=True)
     emergency_contact = models.CharField(max_length=15)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.admission_number})"
@@ -35,6 +36,7 @@ class Attendance(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     remarks = models.TextField(blank=True)
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.student} - {self.date} - {self.status}"
@@ -44,6 +46,27 @@ class Attendance(models.Model):
         ordering = ['-date']
 
 
+# Ghana grading system: (minimum total score, grade, remarks), best first
+GRADE_BOUNDARIES = (
+    (Decimal('80'), '1', 'Highest'),
+    (Decimal('70'), '2', 'Higher'),
+    (Decimal('65'), '3', 'High'),
+    (Decimal('60'), '4', 'High Average'),
+    (Decimal('55'), '5', 'Average'),
+    (Decimal('50'), '6', 'Low Average'),
+    (Decimal('45'), '7', 'Low'),
+    (Decimal('40'), '8', 'Lower'),
+)
+
+
+def grade_for_score(total_score):
+    """Return the (grade, remarks) pair for a total score out of 100."""
+    for minimum, grade, remarks in GRADE_BOUNDARIES:
+        if total_score >= minimum:
+            return grade, remarks
+    return '9', 'Lowest'
+
+
 class Grade(models.Model):
     # Fixed TERM_CHOICES - using consistent values with display names
     TERM_CHOICES = (
@@ -93,7 +116,8 @@ class Grade(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    def save(self, *args, **kwargs):
+    def calculate_result(self):
+        """Derive total_score, grade and remarks from the two component scores."""
         # Convert scores to Decimal if they are strings or other types
         try:
             self.class_score = Decimal(str(self.class_score).strip())
@@ -110,34 +134,10 @@ class Grade(models.Model):
         if self.total_score > Decimal('100'):
             self.total_score = Decimal('100.00')
         
-        # Determine grade based on total score (Ghana grading system)
-        if self.total_score >= Decimal('80'):
-            self.grade = '1'
-            self.remarks = 'Highest'
-        elif self.total_score >= Decimal('70'):
-            self.grade = '2'
-            self.remarks = 'Higher'
-        elif self.total_score >= Decimal('65'):
-            self.grade = '3'
-            self.remarks = 'High'
-        elif self.total_score >= Decimal('60'):
-            self.grade = '4'
-            self.remarks = 'High Average'
-        elif self.total_score >= Decimal('55'):
-            self.grade = '5'
-            self.remarks = 'Average'
-        elif self.total_score >= Decimal('50'):
-            self.grade = '6'
-            self.remarks = 'Low Average'
-        elif self.total_score >= Decimal('45'):
-            self.grade = '7'
-            self.remarks = 'Low'
-        elif self.total_score >= Decimal('40'):
-            self.grade = '8'
-            self.remarks = 'Lower'
-        else:
-            self.grade = '9'
-            self.remarks = 'Lowest'
+        self.grade, self.remarks = grade_for_score(self.total_score)
+
+    def save(self, *args, **kwargs):
+        self.calculate_result()
         
         super().save(*args, **kwargs)
         
@@ -145,29 +145,18 @@ class Grade(models.Model):
         self.update_subject_rankings()
     
     def update_subject_rankings(self):
-        """Update rankings for all students in the same class for this subject"""
-        if not self.student.current_class:
+        """Update rankings for all students in the same class for this subject.
+
+        Inside ``students.ranking.deferred_rankings()`` the group is queued and
+        ranked once when the batch commits instead of on every save.
+        """
+        from students.ranking import ranking_key, request_ranking
+
+        class_id = self.student.current_class_id
+        if not class_id:
             return  # Skip if student has no current class
-            
-        # Get all grades for this subject in the same class, academic year, and term
-        grades_in_subject = Grade.objects.filter(
-            subject=self.subject,
-            academic_year=self.academic_year,
-            term=self.term,
-            student__current_class=self.student.current_class
-        ).exclude(total_score__isnull=True).order_by('-total_score')
-        
-        # Assign positions (handle ties by giving same position to equal scores)
-        previous_score = None
-        position = 0
-        
-        for grade in grades_in_subject:
-            # Convert to Decimal for safe comparison
-            current_score = Decimal(str(grade.total_score))
-            if current_score != previous_score:
-                position += 1
-                previous_score = current_score
-            Grade.objects.filter(id=grade.id).update(subject_position=position)
+
+        request_ranking(ranking_key(self.subject_id, self.academic_year_id, self.term, class_id))
     
     def get_term_display(self):
         """Returns the human-readable term name"""
@@ -215,4 +204,52 @@ class StudentExerciseScore(models.Model):
     remarks = models.CharField(max_length=100, blank=True)
 
     class Meta:
-        unique_together = ['student', 'exercise']
\ No newline at end of file
+        unique_together = ['student', 'exercise']
+
+class ReportCard(models.Model):
+    """Rendered report card HTML, reused until the data behind it changes."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='report_cards')
+    academic_year = models.ForeignKey('academics.AcademicYear', on_delete=models.CASCADE)
+    term = models.CharField(max_length=10, choices=Grade.TERM_CHOICES)
+    content_hash = models.CharField(max_length=64)
+    html = models.TextField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Report card: {self.student} - {self.get_term_display()} ({self.academic_year})"
+
+    class Meta:
+        unique_together = ['student', 'academic_year', 'term']
+
+class StudentSummary(models.Model):
+    """Attendance and grade figures for one student, kept current by signals.
+
+    See students.summaries; rebuild with ``manage.py rebuild_student_summaries``.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='summary')
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    excused_count = models.PositiveIntegerField(default=0)
+    attendance_total = models.PositiveIntegerField(default=0)
+    grade_count = models.PositiveIntegerField(default=0)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Latest class position per term, keyed "<academic_year_id>:<term>"
+    class_positions = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def attendance_stats(self):
+        """Same shape as students.utils.attendance_stats()."""
+        stats = {status: getattr(self, f'{status}_count') for status, _label in Attendance.STATUS_CHOICES}
+        stats['total'] = self.attendance_total
+        stats['percentage'] = (
+            round((self.present_count / self.attendance_total) * 100, 2) if self.attendance_total else 0
+        )
+        return stats
+
+    def class_position(self, academic_year, term):
+        academic_year_id = getattr(academic_year, 'id', academic_year)
+        return self.class_positions.get(f'{academic_year_id}:{term}')
+
+    def __str__(self):
+        return f"Summary: {self.student}"
@@ -0,0 +1,99 @@
+"""
+Subject ranking engine for Grade rows.
+
+A subject position is the dense rank of ``total_score`` inside a ranking
+group: (subject, academic_year, term, class). Ranks for any number of groups
+are computed with a single window-function query and written back with one
+``bulk_update`` of the rows whose position actually changed.
+
+Grade saves normally rank their group immediately. Wrap a batch of saves in
+``deferred_rankings()`` to collect the touched groups instead and rank each of
+them once, after the surrounding transaction commits.
+"""
+import operator
+import threading
+from contextlib import contextmanager
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import F, FloatField, Q, Window
+from django.db.models.functions import Cast, DenseRank
+
+_state = threading.local()
+
+
+def ranking_key(subject_id, academic_year_id, term, class_id):
+    """Build the hashable key identifying one ranking group."""
+    return (subject_id, academic_year_id, term, class_id)
+
+
+def rank_groups(groups):
+    """Recompute subject positions for every group in ``groups``.
+
+    Returns the number of Grade rows whose position changed.
+    """
+    from students.models import Grade
+
+    groups = {g for g in groups if g and g[3]}
+    if not groups:
+        return 0
+
+    group_filter = reduce(operator.or_, (
+        Q(subject_id=subject_id, academic_year_id=year_id, term=term,
+          student__current_class_id=class_id)
+        for subject_id, year_id, term, class_id in groups
+    ))
+
+    ranked = Grade.objects.filter(group_filter).exclude(
+        total_score__isnull=True
+    ).annotate(
+        rank=Window(
+            expression=DenseRank(),
+            partition_by=[F('subject_id'), F('academic_year_id'), F('term'),
+                          F('student__current_class_id')],
+            # Ordering by the raw DecimalField makes SQLite wrap the ORDER BY
+            # clause in a CAST, so rank on a float copy of the score instead.
+            order_by=Cast('total_score', FloatField()).desc(),
+        )
+    ).only('id', 'subject_position')
+
+    changed = []
+    for grade in ranked:
+        if grade.subject_position != grade.rank:
+            grade.subject_position = grade.rank
+            changed.append(grade)
+
+    if changed:
+        Grade.objects.bulk_update(changed, ['subject_position'], batch_size=500)
+    return len(changed)
+
+
+def request_ranking(key):
+    """Rank ``key`` now, or queue it if a deferred batch is open."""
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        rank_groups([key])
+    else:
+        pending.add(key)
+
+
+@contextmanager
+def deferred_rankings():
+    """Collect ranking requests and run them once when the batch commits.
+
+    Nested blocks share the outermost batch. If the block raises, nothing is
+    ranked (the writes are expected to roll back with it).
+    """
+    if getattr(_state, 'pending', None) is not None:
+        yield _state.pending
+        return
+
+    pending = set()
+    _state.pending = pending
+    try:
+        yield pending
+    finally:
+        _state.pending = None
+
+    if pending:
+        transaction.on_commit(lambda: rank_groups(pending))
@@ -0,0 +1,223 @@
+"""
+Report card data for one or many students.
+
+``iter_report_contexts`` walks the selected students in chunks. Each chunk
+costs one grade query and one StudentSummary query (attendance and class
+positions); positions missing from a summary fall back to the cached class
+leaderboards, and SchoolInfo is read once for the whole run, so a year group
+costs a handful of queries instead of several per student.
+
+``render_report_card`` keeps each student's rendered card in the ReportCard
+table, keyed by a hash of the rows it was built from, so repeat views of an
+unchanged card skip the report computation and template render entirely.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import date
+from functools import lru_cache
+
+from django.template.loader import get_template
+
+from academics.utils import get_school_info
+from students.models import Grade, ReportCard, grade_for_score
+from students.summaries import get_student_summary, summaries_for_students
+from students.utils import calculate_class_position, class_leaderboard, term_filter_values
+
+REPORT_CHUNK_SIZE = 50
+
+# Shown when SchoolInfo has not been configured yet
+_DEFAULT_SCHOOL = {
+    'school_name': "St. Peter's Methodist Junior High School",
+    'school_address': "P.O. Box 123, Kumasi, Ghana",
+    'school_phone': "+233 123 456 789",
+    'school_email': "info@spswjh.edu.gh",
+    'school_motto': "Knowledge is Power",
+    'school_logo': None,
+}
+
+
+def _school_context(school_info):
+    if not school_info:
+        return dict(_DEFAULT_SCHOOL)
+    return {
+        'school_name': school_info.name,
+        'school_address': school_info.address,
+        'school_phone': school_info.phone,
+        'school_email': school_info.email,
+        'school_motto': school_info.motto,
+        'school_logo': school_info.logo,
+    }
+
+
+def _grades_by_student(student_ids, academic_year, term):
+    grades = Grade.objects.filter(
+        student_id__in=student_ids,
+        academic_year=academic_year,
+        term__in=term_filter_values(term),
+    ).select_related('subject').order_by('subject__name')
+
+    by_student = defaultdict(list)
+    for grade in grades:
+        by_student[grade.student_id].append(grade)
+    return by_student
+
+
+def _compose_report(student, grades, attendance, class_position, academic_year,
+                    term, raw_term, school, report_date):
+    total_subjects = len(grades)
+    total_class_work = sum(float(g.class_score) for g in grades)
+    total_exams = sum(float(g.exams_score) for g in grades)
+    grand_total = sum(float(g.total_score) for g in grades)
+    average_percentage = grand_total / total_subjects if total_subjects else 0
+
+    # Calculate overall grade based on average
+    overall_grade, overall_remarks = grade_for_score(average_percentage)
+
+    report = {
+        'student': student,
+        'academic_year': academic_year,
+        'term': term,
+        'term_display': dict(Grade.TERM_CHOICES).get(term, raw_term),
+        'grades': grades,
+        'total_subjects': total_subjects,
+        'total_class_work': total_class_work,
+        'total_exams': total_exams,
+        'grand_total': grand_total,
+        'average_percentage': average_percentage,
+        'overall_grade': overall_grade,
+        'overall_remarks': overall_remarks,
+        'class_position': class_position,
+        'attendance_stats': attendance,
+        'report_date': report_date,
+        'remarks': '',
+        'term_choices': Grade.TERM_CHOICES,
+    }
+    report.update(school)
+    return report
+
+
+def iter_report_contexts(students, academic_year, term, raw_term, chunk_size=REPORT_CHUNK_SIZE,
+                         report_date=None, request=None):
+    """Yield a report card context for each student, in the given order."""
+    students = list(students)
+    report_date = report_date or date.today()
+    school = _school_context(get_school_info(request))
+    leaderboards = {}
+
+    for start in range(0, len(students), chunk_size):
+        chunk = students[start:start + chunk_size]
+        ids = [s.id for s in chunk]
+        grades = _grades_by_student(ids, academic_year, term)
+        summaries = summaries_for_students(ids)
+
+        for student in chunk:
+            summary = summaries[student.id]
+            class_position = summary.class_position(academic_year, term)
+            if class_position is None and student.current_class_id:
+                board = leaderboards.get(student.current_class_id)
+                if board is None:
+                    board = class_leaderboard(student.current_class_id, academic_year, term)
+                    leaderboards[student.current_class_id] = board
+                class_position = board.get(student.id)
+                if class_position is None:
+                    # Cached table predates this student; let the helper rebuild it
+                    class_position = calculate_class_position(student, academic_year, term)
+                    leaderboards.pop(student.current_class_id)
+
+            yield _compose_report(
+                student,
+                grades.get(student.id, []),
+                summary.attendance_stats(),
+                class_position,
+                academic_year,
+                term,
+                raw_term,
+                school,
+                report_date,
+            )
+
+
+def build_report_context(student, academic_year, term, raw_term, report_date=None, request=None):
+    """Report card context for a single student."""
+    return next(iter_report_contexts(
+        [student], academic_year, term, raw_term, report_date=report_date, request=request,
+    ))
+
+
+@lru_cache(maxsize=None)
+def _report_template_digest():
+    # Template edits invalidate every stored card on the next deploy
+    source = get_template('students/report_card.html').template.source
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def _report_sources(student, academic_year, term):
+    """``(grades, summary, class_position)`` a single report card is built from."""
+    grades = list(Grade.objects.filter(
+        student=student,
+        academic_year=academic_year,
+        term__in=term_filter_values(term),
+    ).select_related('subject').order_by('subject__name', 'id'))
+    summary = get_student_summary(student)
+    class_position = summary.class_position(academic_year, term)
+    if class_position is None:
+        class_position = calculate_class_position(student, academic_year, term)
+    return grades, summary, class_position
+
+
+def report_card_fingerprint(student, academic_year, term, school_info=None, sources=None):
+    """Hash the data a student's report card is rendered from.
+
+    Covers the student's grades for the term (scores, subject names,
+    positions and last update), attendance counts, class position, student
+    details, the academic year and term labels and the school header, plus
+    the report template itself. The printed date is not part of it: a stored
+    card keeps the date it was rendered on (``ReportCard.rendered_at``).
+    """
+    grades, summary, class_position = sources or _report_sources(student, academic_year, term)
+    parts = [
+        _report_template_digest(),
+        repr([(g.id, g.total_score, g.subject_position, g.updated_at, g.subject.name) for g in grades]),
+        repr(sorted(summary.attendance_stats().items())),
+        repr(class_position),
+        repr((student.user.get_full_name(), student.admission_number,
+              student.current_class_id, str(student.current_class or ''),
+              student.user.profile_picture.name or '')),
+        repr((academic_year.name, term, dict(Grade.TERM_CHOICES).get(term), Grade.TERM_CHOICES)),
+        repr(sorted(_school_context(school_info).items(), key=lambda item: item[0])),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def render_report_card(student, academic_year, term, raw_term, request=None):
+    """Return the report card HTML, reusing the stored copy when still current.
+
+    The rows read for the fingerprint also build the card on a miss, so a
+    re-render costs no queries beyond the check itself.
+    """
+    if academic_year is None or term not in dict(Grade.TERM_CHOICES):
+        return get_template('students/report_card.html').render(
+            build_report_context(student, academic_year, term, raw_term, request=request)
+        )
+
+    school_info = get_school_info(request)
+    sources = _report_sources(student, academic_year, term)
+    fingerprint = report_card_fingerprint(student, academic_year, term, school_info, sources)
+    stored = ReportCard.objects.filter(
+        student=student, academic_year=academic_year, term=term
+    ).only('content_hash', 'html').first()
+    if stored and stored.content_hash == fingerprint:
+        return stored.html
+
+    grades, summary, class_position = sources
+    html = get_template('students/report_card.html').render(_compose_report(
+        student, grades, summary.attendance_stats(), class_position,
+        academic_year, term, raw_term, _school_context(school_info), date.today(),
+    ))
+    ReportCard.objects.update_or_create(
+        student=student,
+        academic_year=academic_year,
+        term=term,
+        defaults={'content_hash': fingerprint, 'html': html},
+    )
+    return html
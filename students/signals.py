@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from students.models import Attendance, Grade, Student
+from students.summaries import queue_summary_refresh
+from students.utils import invalidate_class_leaderboard
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def grade_changed(sender, instance, **kwargs):
+    """Keep cached class leaderboards and student summaries in step with Grade writes."""
+    try:
+        class_id = instance.student.current_class_id
+    except Student.DoesNotExist:
+        # Student row already gone (cascade delete)
+        return
+    positions = ()
+    if class_id:
+        # After commit, or a concurrent request could re-cache the old totals
+        transaction.on_commit(lambda: invalidate_class_leaderboard(
+            class_id, instance.academic_year_id, instance.term,
+        ))
+        positions = [(class_id, instance.academic_year_id, instance.term)]
+    queue_summary_refresh(grades=[instance.student_id], positions=positions)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    """Recount the student's attendance summary."""
+    queue_summary_refresh(attendance=[instance.student_id])
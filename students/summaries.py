@@ -0,0 +1,187 @@
+"""
+Materialized StudentSummary rows.
+
+Read paths load one StudentSummary instead of aggregating Attendance and
+Grade rows on every request. Signals (students.signals) and the bulk write
+paths call ``queue_summary_refresh``; the affected students are recounted
+once when the surrounding transaction commits, so a loop of saves inside one
+transaction costs one refresh rather than one per save.
+"""
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from students.models import Attendance, Grade, Student, StudentSummary
+from students.utils import attendance_stats_for_students, class_leaderboard, normalize_term
+
+_state = threading.local()
+
+_ATTENDANCE_FIELDS = [f'{status}_count' for status, _label in Attendance.STATUS_CHOICES] + [
+    'attendance_total', 'updated_at',
+]
+_GRADE_FIELDS = ['grade_count', 'average_score', 'updated_at']
+
+
+def position_key(academic_year_id, term):
+    return f'{academic_year_id}:{normalize_term(term)}'
+
+
+def _summaries_for(student_ids):
+    """Return ``{student_id: StudentSummary}``, creating missing rows."""
+    student_ids = set(student_ids)
+    summaries = {s.student_id: s for s in StudentSummary.objects.filter(student_id__in=student_ids)}
+    missing = [StudentSummary(student_id=sid) for sid in student_ids - summaries.keys()]
+    if missing:
+        StudentSummary.objects.bulk_create(missing, ignore_conflicts=True)
+        summaries.update(
+            (s.student_id, s) for s in StudentSummary.objects.filter(
+                student_id__in=[m.student_id for m in missing]
+            )
+        )
+    return summaries
+
+
+def _existing_student_ids(student_ids):
+    # Signals can fire for students that are being deleted
+    return set(Student.objects.filter(id__in=set(student_ids)).values_list('id', flat=True))
+
+
+def refresh_attendance_summaries(student_ids):
+    """Recount attendance for ``student_ids`` with one GROUP BY query."""
+    student_ids = _existing_student_ids(student_ids)
+    if not student_ids:
+        return
+    stats = attendance_stats_for_students(student_ids)
+    summaries = _summaries_for(student_ids)
+    for student_id, summary in summaries.items():
+        counts = stats[student_id]
+        for status, _label in Attendance.STATUS_CHOICES:
+            setattr(summary, f'{status}_count', counts[status])
+        summary.attendance_total = counts['total']
+    _save(summaries.values(), _ATTENDANCE_FIELDS)
+
+
+def refresh_grade_summaries(student_ids):
+    """Recount grades and average total score for ``student_ids``."""
+    student_ids = _existing_student_ids(student_ids)
+    if not student_ids:
+        return
+    rows = {
+        row['student_id']: row for row in Grade.objects.filter(student_id__in=student_ids)
+        .values('student_id').annotate(grade_count=Count('id'), average_score=Avg('total_score'))
+        .order_by()
+    }
+    summaries = _summaries_for(student_ids)
+    for student_id, summary in summaries.items():
+        row = rows.get(student_id)
+        summary.grade_count = row['grade_count'] if row else 0
+        average = row['average_score'] if row else None
+        summary.average_score = Decimal(str(round(average, 2))) if average is not None else Decimal('0')
+    _save(summaries.values(), _GRADE_FIELDS)
+
+
+def refresh_class_positions(class_id, academic_year_id, term):
+    """Store the class/term leaderboard positions on each student's summary."""
+    board = class_leaderboard(class_id, academic_year_id, term)
+    if not board:
+        return
+    key = position_key(academic_year_id, term)
+    changed = []
+    for student_id, summary in _summaries_for(board.keys()).items():
+        if summary.class_positions.get(key) != board[student_id]:
+            summary.class_positions = {**summary.class_positions, key: board[student_id]}
+            changed.append(summary)
+    _save(changed, ['class_positions', 'updated_at'])
+
+
+def _save(summaries, fields):
+    summaries = list(summaries)
+    now = timezone.now()
+    for summary in summaries:
+        summary.updated_at = now
+    if summaries:
+        StudentSummary.objects.bulk_update(summaries, fields, batch_size=500)
+
+
+def _pending():
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        pending = _state.pending = {'attendance': set(), 'grades': set(), 'positions': set()}
+    return pending
+
+
+def queue_summary_refresh(attendance=(), grades=(), positions=()):
+    """Refresh summaries after the current transaction commits.
+
+    ``attendance`` and ``grades`` are student ids; ``positions`` holds
+    ``(class_id, academic_year_id, term)`` groups. Outside a transaction the
+    refresh runs immediately.
+    """
+    pending = _pending()
+    pending['attendance'].update(attendance)
+    pending['grades'].update(grades)
+    pending['positions'].update(positions)
+    transaction.on_commit(flush_summary_refresh)
+
+
+def flush_summary_refresh():
+    """Run every queued refresh. Later on_commit callbacks find nothing to do."""
+    pending = _pending()
+    attendance, grades, positions = pending['attendance'], pending['grades'], pending['positions']
+    if not (attendance or grades or positions):
+        return
+    _state.pending = None
+
+    if attendance:
+        refresh_attendance_summaries(attendance)
+    if grades:
+        refresh_grade_summaries(grades)
+    for class_id, academic_year_id, term in positions:
+        refresh_class_positions(class_id, academic_year_id, term)
+
+
+def rebuild_student_summaries(student_ids=None):
+    """Recompute summaries from scratch; all students when ``student_ids`` is None.
+
+    Returns the number of students refreshed.
+    """
+    students = Student.objects.all()
+    if student_ids is not None:
+        students = students.filter(id__in=student_ids)
+    ids = list(students.values_list('id', flat=True))
+    if not ids:
+        return 0
+
+    refresh_attendance_summaries(ids)
+    refresh_grade_summaries(ids)
+    groups = Grade.objects.filter(
+        student_id__in=ids, student__current_class__isnull=False,
+    ).values_list('student__current_class_id', 'academic_year_id', 'term').distinct()
+    for class_id, academic_year_id, term in {(c, y, normalize_term(t)) for c, y, t in groups}:
+        refresh_class_positions(class_id, academic_year_id, term)
+    return len(ids)
+
+
+def get_student_summary(student):
+    """Load a student's summary, building it on first use."""
+    summary = StudentSummary.objects.filter(student=student).first()
+    if summary is None:
+        rebuild_student_summaries([student.id])
+        summary = StudentSummary.objects.get(student=student)
+    return summary
+
+
+def summaries_for_students(student_ids):
+    """``{student_id: StudentSummary}`` in one query, building any missing rows."""
+    student_ids = list(student_ids)
+    summaries = {s.student_id: s for s in StudentSummary.objects.filter(student_id__in=student_ids)}
+    missing = [sid for sid in student_ids if sid not in summaries]
+    if missing:
+        rebuild_student_summaries(missing)
+        summaries.update(
+            (s.student_id, s) for s in StudentSummary.objects.filter(student_id__in=missing)
+        )
+    return summaries
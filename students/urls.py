@@ -6,6 +6,7 @@ app_name = 'students'
 urlpatterns = [
     path('', views.student_list, name='student_list'),
     path('attendance/mark/', views.mark_attendance, name='mark_attendance'),
+    path('attendance/sync/', views.sync_attendance, name='sync_attendance'),
     path('get-class-students/<int:class_id>/', views.get_class_students, name='get_class_students'),
     path('dashboard/', views.student_dashboard_view, name='student_dashboard'),
     path('schedule/', views.student_schedule, name='student_schedule'),
@@ -1,5 +1,11 @@
-from students.models import Grade
-from django.db.models import Sum
+from students.models import Attendance, Student
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+# Leaderboards are invalidated on every Grade change; the timeout only bounds
+# staleness after students move between classes.
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60
 
 
 # Map various user-facing term labels to canonical values
@@ -37,37 +43,92 @@ def term_filter_values(term: str):
     return [canonical] + aliases
 
 
+def _leaderboard_cache_key(class_id, academic_year_id, term):
+    return f'students:leaderboard:{class_id}:{academic_year_id}:{normalize_term(term)}'
+
+
+def _build_class_leaderboard(class_id, academic_year, term):
+    term_values = term_filter_values(term)
+    ranked_ids = Student.objects.filter(current_class_id=class_id).annotate(
+        term_total=Coalesce(
+            Sum('grade__total_score', filter=Q(
+                grade__academic_year=academic_year,
+                grade__term__in=term_values,
+            )),
+            Value(0),
+            output_field=DecimalField(max_digits=8, decimal_places=2),
+        )
+    ).order_by('-term_total', 'id').values_list('id', flat=True)
+    return {student_id: position for position, student_id in enumerate(ranked_ids, start=1)}
+
+
+def class_leaderboard(class_id, academic_year, term):
+    """Return ``{student_id: position}`` for a class in a given term.
+
+    The whole table is built with one GROUP BY query and kept in the cache
+    until a Grade in that class/year/term changes.
+    """
+    academic_year_id = getattr(academic_year, 'id', academic_year)
+    key = _leaderboard_cache_key(class_id, academic_year_id, term)
+    board = cache.get(key)
+    if board is None:
+        board = _build_class_leaderboard(class_id, academic_year_id, term)
+        cache.set(key, board, LEADERBOARD_CACHE_TIMEOUT)
+    return board
+
+
+def invalidate_class_leaderboard(class_id, academic_year_id, term):
+    """Drop the cached leaderboard for a class/year/term."""
+    cache.delete(_leaderboard_cache_key(class_id, academic_year_id, term))
+
+
 def calculate_class_position(student, academic_year, term):
     """Calculate student's overall position in class for a given term."""
 
-    if not student.current_class:
+    if not student.current_class_id:
         return None
 
-    term_values = term_filter_values(term)
+    board = class_leaderboard(student.current_class_id, academic_year, term)
+    if student.id not in board:
+        # Student joined the class after the table was cached
+        invalidate_class_leaderboard(student.current_class_id, getattr(academic_year, 'id', academic_year), term)
+        board = class_leaderboard(student.current_class_id, academic_year, term)
+
+    return board.get(student.id)
+
+
+def _attendance_count_annotations():
+    counts = {'total': Count('id')}
+    for status, _label in Attendance.STATUS_CHOICES:
+        counts[status] = Count('id', filter=Q(status=status))
+    return counts
+
 
-    # Get all students in the same class
-    students_in_class = student.current_class.student_set.all()
+def _attendance_stats_from_counts(counts):
+    stats = {status: counts.get(status) or 0 for status, _label in Attendance.STATUS_CHOICES}
+    total = counts.get('total') or 0
+    stats['total'] = total
+    stats['percentage'] = round((stats['present'] / total) * 100, 2) if total else 0
+    return stats
 
-    # Calculate total scores for each student
-    student_totals = []
-    for s in students_in_class:
-        total = Grade.objects.filter(
-            student=s,
-            academic_year=academic_year,
-            term__in=term_values
-        ).aggregate(total=Sum('total_score'))['total'] or 0
 
-        student_totals.append({
-            'student': s,
-            'total': total
-        })
+def attendance_stats(student):
+    """Per-status attendance counts and present percentage, in one query."""
+    counts = Attendance.objects.filter(student=student).aggregate(**_attendance_count_annotations())
+    return _attendance_stats_from_counts(counts)
 
-    # Sort by total (descending)
-    student_totals.sort(key=lambda x: x['total'], reverse=True)
 
-    # Find position
-    for position, data in enumerate(student_totals, start=1):
-        if data['student'].id == student.id:
-            return position
+def attendance_stats_for_students(student_ids):
+    """``{student_id: stats}`` for many students with a single GROUP BY.
 
-    return None
\ No newline at end of file
+    Students without any attendance rows get zeroed stats.
+    """
+    student_ids = list(student_ids)
+    rows = Attendance.objects.filter(student_id__in=student_ids).values('student_id').annotate(
+        **_attendance_count_annotations()
+    ).order_by()
+    stats = {row['student_id']: _attendance_stats_from_counts(row) for row in rows}
+    for student_id in student_ids:
+        if student_id not in stats:
+            stats[student_id] = _attendance_stats_from_counts({})
+    return stats
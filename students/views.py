@@ -1,12 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count, Avg
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db import transaction
+from django.db.models import Q, Count, Avg, Sum
 from datetime import date, timedelta
 import csv
+import json
 from .models import Student, Attendance, Grade
-from .utils import calculate_class_position, normalize_term, term_filter_values
+from .reports import iter_report_contexts, render_report_card
+from .rosters import roster_response
+from .attendance import save_attendance_batch
+from .summaries import get_student_summary
+from .utils import normalize_term
+from academics.feeds import feed_urls
 from academics.models import Class, AcademicYear, Timetable
 from teachers.models import Teacher
 
@@ -82,23 +92,9 @@ def student_details_ajax(request, student_id):
     """Return student details as JSON for modal"""
     student = get_object_or_404(Student, id=student_id)
     
-    # Attendance stats
-    total_attendance = Attendance.objects.filter(student=student).count()
-    present_count = Attendance.objects.filter(student=student, status='present').count()
-    absent_count = Attendance.objects.filter(student=student, status='absent').count()
-    
-    attendance_percentage = 0
-    if total_attendance > 0:
-        attendance_percentage = round((present_count / total_attendance) * 100, 2)
-    
-    # Grade stats
-    grades = Grade.objects.filter(student=student)
-    grades_count = grades.count()
-    
-    average_percentage = 0
-    if grades.exists():
-        total_percentage = sum([g.percentage() for g in grades])
-        average_percentage = round(total_percentage / grades_count, 2)
+    # Attendance and grade stats from the student's summary row
+    summary = get_student_summary(student)
+    attendance = summary.attendance_stats()
     
     data = {
         'name': student.user.get_full_name(),
@@ -109,13 +105,13 @@ def student_details_ajax(request, student_id):
         'emergency_contact': student.emergency_contact,
         'blood_group': student.blood_group,
         'attendance': {
-            'present': present_count,
-            'absent': absent_count,
-            'total': total_attendance,
-            'percentage': attendance_percentage
+            'present': attendance['present'],
+            'absent': attendance['absent'],
+            'total': attendance['total'],
+            'percentage': attendance['percentage']
         },
-        'grades_count': grades_count,
-        'average_percentage': average_percentage
+        'grades_count': summary.grade_count,
+        'average_percentage': float(summary.average_score)
     }
     
     return JsonResponse(data)
@@ -125,7 +121,6 @@ def student_details_ajax(request, student_id):
 def bulk_assign_class(request):
     """Bulk assign students to a class"""
     if request.method == 'POST':
-        import json
         data = json.loads(request.body)
         student_ids = data.get('student_ids', [])
         class_id = data.get('class_id')
@@ -134,7 +129,7 @@ def bulk_assign_class(request):
             return JsonResponse({'error': 'Missing data'}, status=400)
         
         class_obj = get_object_or_404(Class, id=class_id)
-        Student.objects.filter(id__in=student_ids).update(current_class=class_obj)
+        Student.objects.filter(id__in=student_ids).update(current_class=class_obj, updated_at=timezone.now())
         
         return JsonResponse({
             'message': f'{len(student_ids)} students assigned to {class_obj.name}'
@@ -202,22 +197,19 @@ def mark_attendance(request):
             messages.error(request, 'You are not assigned to this class')
             return redirect('students:mark_attendance')
         
-        for student_id in student_ids:
-            status = request.POST.get(f'status_{student_id}')
-            student = Student.objects.filter(id=student_id, current_class=class_obj).first()
-            if not student:
-                continue
-            
-            Attendance.objects.update_or_create(
-                student=student,
-                date=date_str,
-                defaults={
-                    'status': status,
-                    'marked_by': request.user
-                }
-            )
+        attendance_date = parse_date(date_str or '')
+        if attendance_date is None:
+            messages.error(request, 'Enter a valid attendance date')
+            return redirect('students:mark_attendance')
+
+        saved = save_attendance_batch(
+            class_obj,
+            attendance_date,
+            ((student_id, request.POST.get(f'status_{student_id}')) for student_id in student_ids),
+            user=request.user,
+        )
         
-        messages.success(request, f'Attendance marked successfully for {len(student_ids)} students')
+        messages.success(request, f'Attendance marked successfully for {saved} students')
         return redirect('students:mark_attendance')
     
     classes = allowed_classes
@@ -241,26 +233,132 @@ def get_class_students(request, class_id):
         if class_obj not in allowed:
             return JsonResponse({'error': 'Forbidden: You are not the class teacher for this class'}, status=403)
 
-    students = Student.objects.filter(current_class=class_obj).select_related('user')
+    students = Student.objects.filter(current_class=class_obj).order_by('id')
     
     # Check for date parameter to pre-fill attendance
-    date_str = request.GET.get('date')
-    attendance_map = {}
-    if date_str:
-        attendances = Attendance.objects.filter(student__current_class=class_obj, date=date_str)
-        attendance_map = {a.student_id: a.status for a in attendances}
-
-    data = [
-        {
-            'id': s.id,
-            'name': s.user.get_full_name(),
-            'admission_number': s.admission_number,
-            'roll_number': s.roll_number,
-            'existing_status': attendance_map.get(s.id) # Will be None if not marked
-        }
-        for s in students
-    ]
-    return JsonResponse(data, safe=False)
+    attendance_date = parse_date(request.GET.get('date') or '')
+    related = []
+    if attendance_date:
+        related.append(Attendance.objects.filter(student__current_class=class_obj, date=attendance_date))
+
+    def build_rows(roster):
+        attendance_map = {}
+        if related:
+            attendance_map = dict(related[0].filter(student__in=roster).values_list('student_id', 'status'))
+        return [
+            # existing_status is None if not marked
+            [s.id, s.user.get_full_name(), s.admission_number, s.roll_number, attendance_map.get(s.id)]
+            for s in roster.select_related('user')
+        ]
+
+    return roster_response(
+        request, students,
+        ['id', 'name', 'admission_number', 'roll_number', 'existing_status'],
+        build_rows, related,
+    )
+
+
+def _client_datetime(value):
+    """Parse an ISO timestamp sent by the browser; None if missing or malformed."""
+    try:
+        moment = parse_datetime(str(value or ''))
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@login_required
+def sync_attendance(request):
+    """Replay attendance submissions queued by the attendance page while offline.
+
+    Expects ``{"sent_at", "submissions": [{"id", "queued_at", "class_id", "date",
+    "marks": {student_id: status}}]}``, with both times read from the
+    device's clock. The gap between ``sent_at`` and the moment the server
+    received the request corrects ``queued_at`` for clock skew before it is
+    compared with ``Attendance.updated_at``.
+
+    Each submission is an upsert. A mark whose stored status already matches
+    counts as saved, so replaying a submission the server already applied
+    is harmless. A mark for a row changed (to a different status) after the
+    submission was queued is skipped, so a register replayed late cannot
+    overwrite a newer one. Every submission gets a result carrying its id:
+    "saved" (with the saved and skipped counts), or "rejected" when it can
+    never succeed and the client should drop it.
+    """
+    if request.user.user_type not in ['admin', 'teacher']:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    received_at = timezone.now()
+    try:
+        body = json.loads(request.body)
+        submissions = body.get('submissions', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(submissions, list):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    sent_at = _client_datetime(body.get('sent_at'))
+    # Shift device timestamps onto the server clock
+    clock_offset = received_at - sent_at if sent_at else timedelta(0)
+
+    allowed_classes = Class.objects.filter(academic_year__is_current=True)
+    if request.user.user_type == 'teacher':
+        teacher_profile = Teacher.objects.filter(user=request.user).first()
+        allowed_classes = allowed_classes.filter(class_teacher=teacher_profile)
+    allowed_classes = {c.id: c for c in allowed_classes}
+
+    results = []
+    for submission in submissions:
+        if not isinstance(submission, dict):
+            continue
+        result = {'id': str(submission.get('id', ''))[:64]}
+        marks = submission.get('marks')
+        attendance_date = parse_date(str(submission.get('date') or ''))
+        queued_at = _client_datetime(submission.get('queued_at'))
+        if queued_at is not None:
+            queued_at = min(queued_at + clock_offset, received_at)
+        try:
+            class_obj = allowed_classes.get(int(submission.get('class_id')))
+        except (TypeError, ValueError):
+            class_obj = None
+
+        if class_obj is None:
+            result.update(status='rejected', error='You cannot mark attendance for this class')
+        elif attendance_date is None:
+            result.update(status='rejected', error='Invalid date')
+        elif not isinstance(marks, dict):
+            result.update(status='rejected', error='Missing marks')
+        else:
+            with transaction.atomic():
+                stored = {
+                    str(student_id): (status, updated_at)
+                    for student_id, status, updated_at in Attendance.objects.filter(
+                        student__current_class=class_obj, date=attendance_date,
+                    ).values_list('student_id', 'status', 'updated_at')
+                }
+                fresh, unchanged, skipped = [], 0, 0
+                for student_id, status in marks.items():
+                    stored_status, updated_at = stored.get(str(student_id), (None, None))
+                    if stored_status == status:
+                        # Already applied, e.g. a replay after a lost response
+                        unchanged += 1
+                    elif queued_at is not None and updated_at is not None and updated_at > queued_at:
+                        skipped += 1
+                    else:
+                        fresh.append((student_id, status))
+                saved = unchanged + save_attendance_batch(class_obj, attendance_date, fresh, user=request.user)
+            if skipped and not saved:
+                result.update(status='rejected', error=f'The {class_obj} register for {attendance_date} '
+                                                       'was changed after this copy was recorded offline')
+            else:
+                result.update(status='saved', saved=saved, skipped=skipped, class_name=str(class_obj),
+                              date=attendance_date.isoformat())
+        results.append(result)
+
+    return JsonResponse({'results': results})
 
 
 @login_required
@@ -282,21 +380,8 @@ def student_dashboard_view(request):
         student=student
     ).order_by('-date')[:10]
     
-    # Calculate attendance stats
-    total_attendance = Attendance.objects.filter(student=student).count()
-    present_count = Attendance.objects.filter(student=student, status='present').count()
-    absent_count = Attendance.objects.filter(student=student, status='absent').count()
-    
-    attendance_percentage = 0
-    if total_attendance > 0:
-        attendance_percentage = round((present_count / total_attendance) * 100, 2)
-    
-    attendance_stats = {
-        'present': present_count,
-        'absent': absent_count,
-        'total': total_attendance,
-        'percentage': attendance_percentage
-    }
+    # Attendance stats from the student's summary row
+    student_attendance = get_student_summary(student).attendance_stats()
     
     # Get all grades
     grades = Grade.objects.filter(student=student).select_related('subject').order_by('-created_at')
@@ -336,15 +421,17 @@ def student_dashboard_view(request):
     ).order_by('-created_at')[:3]
 
     # Calculate finance stats
-    student_fees = StudentFee.objects.filter(student=student)
-    total_payable = sum(fee.amount_payable for fee in student_fees)
-    total_paid = sum(fee.total_paid for fee in student_fees)
-    balance = val = total_payable - total_paid
+    fee_totals = StudentFee.objects.filter(student=student).aggregate(
+        payable=Sum('amount_payable'), paid=Sum('amount_paid'), balance=Sum('balance')
+    )
+    total_payable = fee_totals['payable'] or 0
+    total_paid = fee_totals['paid'] or 0
+    balance = fee_totals['balance'] or 0
     
     context = {
         'student': student,
         'recent_attendance': recent_attendance,
-        'attendance_stats': attendance_stats,
+        'attendance_stats': student_attendance,
         'grades': grades,
         'homework_list': homework_list,
         'resources': resources,
@@ -358,120 +445,11 @@ def student_dashboard_view(request):
     
     return render(request, 'dashboard/student_dashboard.html', context)
 
-def _get_student_report_context(student, academic_year, term, raw_term):
-    """Helper to generate report card context for a single student"""
-    term_values = term_filter_values(term)
-    
-    # Get all grades for current academic year and term
-    grades = Grade.objects.filter(
-        student=student,
-        academic_year=academic_year,
-        term__in=term_values
-    ).select_related('subject').order_by('subject__name')
-    
-    # Calculate statistics
-    total_subjects = grades.count()
-    
-    total_class_work = 0
-    total_exams = 0
-    grand_total = 0
-    
-    if grades.exists():
-        for grade in grades:
-            total_class_work += float(grade.class_score)
-            total_exams += float(grade.exams_score)
-            grand_total += float(grade.total_score)
-        
-        average_percentage = grand_total / total_subjects if total_subjects > 0 else 0
-    else:
-        average_percentage = 0
-    
-    # Calculate overall grade based on average
-    if average_percentage >= 80:
-        overall_grade = '1'
-        overall_remarks = 'Highest'
-    elif average_percentage >= 70:
-        overall_grade = '2'
-        overall_remarks = 'Higher'
-    elif average_percentage >= 65:
-        overall_grade = '3'
-        overall_remarks = 'High'
-    elif average_percentage >= 60:
-        overall_grade = '4'
-        overall_remarks = 'High Average'
-    elif average_percentage >= 55:
-        overall_grade = '5'
-        overall_remarks = 'Average'
-    elif average_percentage >= 50:
-        overall_grade = '6'
-        overall_remarks = 'Low Average'
-    elif average_percentage >= 45:
-        overall_grade = '7'
-        overall_remarks = 'Low'
-    elif average_percentage >= 40:
-        overall_grade = '8'
-        overall_remarks = 'Lower'
-    else:
-        overall_grade = '9'
-        overall_remarks = 'Lowest'
-    
-    # Calculate class position
-    class_position = calculate_class_position(student, academic_year, term)
-    
-    # Get attendance stats
-    total_attendance = Attendance.objects.filter(student=student).count()
-    present_count = Attendance.objects.filter(student=student, status='present').count()
-    absent_count = Attendance.objects.filter(student=student, status='absent').count()
-    late_count = Attendance.objects.filter(student=student, status='late').count()
-    
-    attendance_percentage = 0
-    if total_attendance > 0:
-        attendance_percentage = round((present_count / total_attendance) * 100, 2)
-    
-    attendance_stats = {
-        'present': present_count,
-        'absent': absent_count,
-        'late': late_count,
-        'total': total_attendance,
-        'percentage': attendance_percentage
-    }
-    
-    # Get School Info for the header
-    from academics.models import SchoolInfo
-    school_info = SchoolInfo.objects.first()
-
-    return {
-        'student': student,
-        'academic_year': academic_year,
-        'term': term,
-        'term_display': dict(Grade.TERM_CHOICES).get(term, raw_term),
-        'grades': grades,
-        'total_subjects': total_subjects,
-        'total_class_work': total_class_work,
-        'total_exams': total_exams,
-        'grand_total': grand_total,
-        'average_percentage': average_percentage,
-        'overall_grade': overall_grade,
-        'overall_remarks': overall_remarks,
-        'class_position': class_position,
-        'attendance_stats': attendance_stats,
-        'report_date': date.today(),
-        'remarks': '',
-        'school_name': school_info.name if school_info else "St. Peter's Methodist Junior High School",
-        'school_address': school_info.address if school_info else "P.O. Box 123, Kumasi, Ghana",
-        'school_phone': school_info.phone if school_info else "+233 123 456 789",
-        'school_email': school_info.email if school_info else "info@spswjh.edu.gh",
-        'school_motto': school_info.motto if school_info else "Knowledge is Power",
-        'school_logo': school_info.logo if school_info else None,
-        'term_choices': Grade.TERM_CHOICES,
-    }
-
-
 @login_required
 def generate_report_card(request, student_id):
     """Generate a printable report card for a student"""
     
-    student = get_object_or_404(Student, id=student_id)
+    student = get_object_or_404(Student.objects.select_related('user', 'current_class'), id=student_id)
     
     # Check permissions (same as before)
     if request.user.user_type == 'student':
@@ -504,9 +482,8 @@ def generate_report_card(request, student_id):
     raw_term = request.GET.get('term', 'first')
     term = normalize_term(raw_term)
 
-    context = _get_student_report_context(student, academic_year, term, raw_term)
-    
-    return render(request, 'students/report_card.html', context)
+    # Served from the stored copy unless the grades/attendance behind it changed
+    return HttpResponse(render_report_card(student, academic_year, term, raw_term, request))
 
 
 @login_required
@@ -527,14 +504,22 @@ def bulk_report_cards(request):
     raw_term = request.GET.get('term', 'first')
     term = normalize_term(raw_term)
     
-    students = Student.objects.filter(id__in=student_ids).select_related('user', 'current_class')
-    
-    reports = []
-    for student in students:
-        report_data = _get_student_report_context(student, academic_year, term, raw_term)
-        reports.append(report_data)
-        
-    return render(request, 'students/bulk_report_cards.html', {'reports': reports})
+    students = list(Student.objects.filter(id__in=student_ids).select_related('user', 'current_class'))
+    reports = iter_report_contexts(students, academic_year, term, raw_term, request=request)
+
+    # Render the page shell and each card separately so the first report cards
+    # reach the browser while later ones are still being built.
+    head = get_template('students/bulk_report_cards_head.html')
+    card = get_template('students/bulk_report_card.html')
+    foot = get_template('students/bulk_report_cards_foot.html')
+
+    def render_pages():
+        yield head.render({'report_count': len(students)})
+        for report in reports:
+            yield card.render({'report': report})
+        yield foot.render({})
+
+    return StreamingHttpResponse(render_pages(), content_type='text/html; charset=utf-8')
 
 
 @login_required
@@ -569,4 +554,8 @@ def student_schedule(request):
             'entries': entries
         })
             
-    return render(request, 'students/schedule.html', {'days': days_data, 'student_class': student.current_class})
+    return render(request, 'students/schedule.html', {
+        'days': days_data,
+        'student_class': student.current_class,
+        'calendar_feed': feed_urls(request, request.user),
+    })
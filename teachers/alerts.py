@@ -0,0 +1,170 @@
+"""
+Lesson reminders for teachers.
+
+Each lesson gets two alerts: one 45 minutes before it starts and one 10
+minutes before. ``alerts_for_day`` turns a day's timetable into Alert
+tuples with exact fire times using a single query. ``run_scheduler`` keeps
+them in a heap and sleeps until the next one is due, so alerts go out on
+time without polling the database. A database error while loading or
+sending is logged and retried after ``RETRY_INTERVAL`` instead of ending
+the loop.
+
+Each alert is identified by (recipient, slot, alert type, lesson date).
+The scheduler remembers which keys it has sent, and a unique constraint on
+Notification backs that up. ``send_alerts`` inserts with
+``bulk_create(ignore_conflicts=True)``, so a second scheduler or a cron
+run cannot send an alert twice.
+"""
+import heapq
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from academics.models import Timetable
+from announcements.models import Notification
+from announcements.notifications import invalidate_notifications
+
+# alert_type -> (minutes before the lesson, message)
+ALERTS = {
+    '45_min': (45, "Reminder: You have {subject} with {class_name} in 45 minutes ({start})."),
+    '10_min': (10, "Hurry up! Your class {subject} with {class_name} starts in 10 minutes ({start})."),
+}
+
+# How often a running scheduler re-reads the timetable to pick up edits
+REFRESH_INTERVAL = timedelta(minutes=15)
+
+# How soon a scheduler retries after the database was unavailable
+RETRY_INTERVAL = timedelta(minutes=1)
+
+# An alert not sent within this long of its fire time (scheduler down, slow
+# cron) is dropped rather than sent with a misleading "in 45 minutes"
+LATE_ALERT_GRACE = timedelta(minutes=10)
+
+Alert = namedtuple('Alert', 'fire_at expires_at recipient_id slot_id alert_type alert_date message')
+
+
+def alert_key(alert):
+    return (alert.recipient_id, alert.slot_id, alert.alert_type, alert.alert_date)
+
+
+def alerts_for_day(day):
+    """Every alert for lessons on ``day`` (a date), earliest first."""
+    slots = Timetable.objects.filter(
+        day=day.weekday(), class_subject__teacher__isnull=False,
+    ).select_related('class_subject__subject', 'class_subject__class_name', 'class_subject__teacher')
+
+    tz = timezone.get_current_timezone()
+    alerts = []
+    for slot in slots:
+        start = timezone.make_aware(datetime.combine(day, slot.start_time), tz)
+        # Each alert stays valid until the next, shorter one takes over
+        next_fire = start
+        for alert_type, (minutes, template) in sorted(ALERTS.items(), key=lambda item: item[1][0]):
+            fire_at = start - timedelta(minutes=minutes)
+            alerts.append(Alert(
+                fire_at=fire_at,
+                expires_at=min(next_fire, fire_at + LATE_ALERT_GRACE),
+                recipient_id=slot.class_subject.teacher.user_id,
+                slot_id=slot.id,
+                alert_type=alert_type,
+                alert_date=day,
+                message=template.format(
+                    subject=slot.class_subject.subject.name,
+                    class_name=slot.class_subject.class_name.name,
+                    start=slot.start_time.strftime('%H:%M'),
+                ),
+            ))
+            next_fire = fire_at
+    return sorted(alerts)
+
+
+def due_alerts(now=None):
+    """Alerts whose fire time has passed and that are not yet stale."""
+    now = now or timezone.now()
+    today = timezone.localtime(now).date()
+    return [alert for alert in alerts_for_day(today) if alert.fire_at <= now < alert.expires_at]
+
+
+def send_alerts(alerts):
+    """Create notifications for ``alerts`` in one insert; existing ones are skipped."""
+    alerts = list(alerts)
+    if not alerts:
+        return 0
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=alert.recipient_id,
+            timetable_slot_id=alert.slot_id,
+            alert_type=alert.alert_type,
+            alert_date=alert.alert_date,
+            message=alert.message,
+        )
+        for alert in alerts
+    ], ignore_conflicts=True)
+    # bulk_create skips post_save, so refresh the recipients' bells here
+    invalidate_notifications(alert.recipient_id for alert in alerts)
+    return len(alerts)
+
+
+def run_scheduler(log, now=timezone.now, sleep=time.sleep, refresh=REFRESH_INTERVAL, retry=RETRY_INTERVAL):
+    """Send alerts as they fall due, forever.
+
+    The day's alerts are kept in a heap ordered by fire time. The process
+    sleeps until the earliest one (or the next timetable refresh), then
+    sends everything that is due in a single insert. ``log`` takes one
+    message string (the management command passes its stdout).
+    """
+    sent = set()
+    heap = []
+    loaded_day = None
+    next_refresh = now()
+
+    while True:
+        # The process outlives any connection timeout; drop a dead one
+        close_old_connections()
+        current = now()
+        today = timezone.localtime(current).date()
+        if loaded_day is not None and today != loaded_day:
+            sent.clear()
+            heap = []
+            loaded_day = None
+        if loaded_day is None or current >= next_refresh:
+            try:
+                alerts = alerts_for_day(today)
+            except DatabaseError as exc:
+                # Keep the alerts already scheduled and try again shortly
+                next_refresh = current + retry
+                log(f"Could not load alerts for {today}: {exc}")
+            else:
+                heap = [alert for alert in alerts
+                        if alert.expires_at > current and alert_key(alert) not in sent]
+                heapq.heapify(heap)
+                loaded_day = today
+                next_refresh = current + refresh
+                log(f"{len(heap)} alerts scheduled for {today}")
+
+        due = []
+        while heap and heap[0].fire_at <= current:
+            alert = heapq.heappop(heap)
+            if alert.expires_at > current and alert_key(alert) not in sent:
+                due.append(alert)
+        if due:
+            try:
+                send_alerts(due)
+            except DatabaseError as exc:
+                # Requeue for the retry; expires_at drops any that go stale meanwhile
+                for alert in due:
+                    heapq.heappush(heap, alert._replace(fire_at=current + retry))
+                log(f"Could not send {len(due)} alerts: {exc}")
+            else:
+                sent.update(alert_key(alert) for alert in due)
+                log(f"Sent {len(due)} alerts")
+
+        tomorrow = timezone.make_aware(
+            datetime.combine(today + timedelta(days=1), datetime.min.time()),
+            timezone.get_current_timezone(),
+        )
+        wake_at = min([next_refresh, tomorrow] + ([heap[0].fire_at] if heap else []))
+        sleep(max((wake_at - now()).total_seconds(), 0))
@@ -9,8 +9,13 @@ from django.contrib import messages
 from django.http import JsonResponse
 from decimal import Decimal, InvalidOperation
 from teachers.models import Teacher, DutyWeek, LessonPlan
-from academics.models import ClassSubject, AcademicYear, Timetable, SchoolInfo, Resource
+from academics.models import ClassSubject, AcademicYear, Timetable, Resource
+from academics.feeds import feed_urls
+from academics.utils import get_school_info
 from students.models import Student, Grade, ClassExercise, StudentExerciseScore
+from students.grading import clean_score_row, save_grade_batch
+from students.ranking import deferred_rankings
+from students.rosters import roster_response
 from students.utils import normalize_term
 from .forms import ResourceForm, LessonPlanForm
 
@@ -54,45 +59,18 @@ def enter_grades(request):
             messages.error(request, 'Invalid class/subject selection.')
             return redirect('teachers:enter_grades')
 
-        created_count = 0
+        rows = []
         for student_id in student_ids:
-            overall_raw = request.POST.get(f'overall_score_{student_id}')
-            class_score_raw = request.POST.get(f'class_score_{student_id}', '')
-            exams_score_raw = request.POST.get(f'exams_score_{student_id}', '')
-
-            class_score = exams_score = None
-
-            # Prefer the explicit class/exam fields; fall back to overall if needed
-            try:
-                if class_score_raw != '' and exams_score_raw != '':
-                    class_score = Decimal(class_score_raw)
-                    exams_score = Decimal(exams_score_raw)
-                elif overall_raw not in (None, ''):
-                    overall = Decimal(overall_raw)
-                    overall = max(Decimal('0'), min(overall, Decimal('100')))
-                    class_score = overall * Decimal('0.3')
-                    exams_score = overall * Decimal('0.7')
-                else:
-                    continue
-            except (InvalidOperation, TypeError):
-                continue
-
-            # Server-side validation of maxima
-            class_score = max(Decimal('0'), min(class_score, Decimal('30')))
-            exams_score = max(Decimal('0'), min(exams_score, Decimal('70')))
-
-            Grade.objects.update_or_create(
-                student_id=student_id,
-                subject=cs.subject,
-                academic_year=academic_year,
-                term=term,
-                defaults={
-                    'class_score': class_score,
-                    'exams_score': exams_score,
-                    'created_by': request.user
-                }
+            cleaned = clean_score_row(
+                request.POST.get(f'class_score_{student_id}', ''),
+                request.POST.get(f'exams_score_{student_id}', ''),
+                request.POST.get(f'overall_score_{student_id}'),
             )
-            created_count += 1
+            if cleaned is not None:
+                rows.append((student_id, *cleaned))
+
+        # One transaction, bulk writes and a single ranking pass for the class
+        created_count = save_grade_batch(cs, academic_year, term, rows, user=request.user)
 
         if created_count == 0:
             messages.warning(request, 'No grades were saved. Please ensure you loaded students and entered scores.')
@@ -111,34 +89,42 @@ def get_students(request, class_id):
     subject_id = request.GET.get('subject_id')
     term = normalize_term(request.GET.get('term', 'first'))
 
-    students = Student.objects.filter(current_class_id=class_id).select_related('user')
+    students = Student.objects.filter(current_class_id=class_id).order_by('id')
 
     academic_year = AcademicYear.objects.filter(is_current=True).first()
-    grades_by_student = {}
+    related = []
     if academic_year and subject_id:
-        grades = Grade.objects.filter(
+        related.append(Grade.objects.filter(
             student__current_class_id=class_id,
             subject_id=subject_id,
             academic_year=academic_year,
             term=term,
-        )
-        grades_by_student = {g.student_id: g for g in grades}
-
-    data = []
-    for s in students:
-        g = grades_by_student.get(s.id)
-        data.append({
-            'id': s.id,
-            'name': s.user.get_full_name(),
-            'admission_number': s.admission_number,
-            'class_score': str(g.class_score) if g else '',
-            'exams_score': str(g.exams_score) if g else '',
-            'total_score': str(g.total_score) if g else '',
-            'grade': g.grade if g else '',
-            'remarks': g.remarks if g else '',
-        })
-
-    return JsonResponse(data, safe=False)
+        ))
+
+    def build_rows(roster):
+        grades_by_student = {}
+        if related:
+            grades_by_student = {g.student_id: g for g in related[0].filter(student__in=roster)}
+        rows = []
+        for s in roster.select_related('user'):
+            g = grades_by_student.get(s.id)
+            rows.append([
+                s.id,
+                s.user.get_full_name(),
+                s.admission_number,
+                str(g.class_score) if g else '',
+                str(g.exams_score) if g else '',
+                str(g.total_score) if g else '',
+                g.grade if g else '',
+                g.remarks if g else '',
+            ])
+        return rows
+
+    return roster_response(
+        request, students,
+        ['id', 'name', 'admission_number', 'class_score', 'exams_score', 'total_score', 'grade', 'remarks'],
+        build_rows, related,
+    )
 
 
 @login_required
@@ -171,7 +157,10 @@ def teacher_schedule(request):
             'entries': entries
         })
             
-    return render(request, 'teachers/schedule.html', {'days': days_data})
+    return render(request, 'teachers/schedule.html', {
+        'days': days_data,
+        'calendar_feed': feed_urls(request, request.user),
+    })
 
 @login_required
 def print_duty_roster(request):
@@ -210,7 +199,7 @@ def print_duty_roster(request):
         'weeks': weeks,
         'year': year,
         'term': term,
-        'school_info': SchoolInfo.objects.first(),
+        'school_info': get_school_info(request),
         'available_terms': ['First', 'Second', 'Third'],
         'academic_years': AcademicYear.objects.all(),
     }
@@ -272,7 +261,7 @@ def enter_exercise_scores(request, exercise_id):
     
     if request.method == 'POST':
         try:
-            with django.db.transaction.atomic():
+            with django.db.transaction.atomic(), deferred_rankings():
                 updated_count = 0
                 for student in students:
                     score_val = request.POST.get(f'score_{student.id}')
@@ -367,7 +356,7 @@ def search_students(request):
     return render(request, 'teachers/search_results.html', {
         'query': query,
         'students': students,
-        'school_name': SchoolInfo.objects.first().name if SchoolInfo.objects.exists() else 'School'
+        'school_name': getattr(get_school_info(request), 'name', 'School'),
     })
 
 
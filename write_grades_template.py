@@ -121,6 +121,7 @@ with open(r'd:/school_management/templates/teachers/enter_grades.html', 'w', enc
     }
 </style>
 
+<script src="{% static 'js/roster-cache.js' %}"></script>
 <script>
 document.getElementById('loadStudents').addEventListener('click', function() {
     const select = document.getElementById('classSubjectSelect');
@@ -138,8 +139,8 @@ document.getElementById('loadStudents').addEventListener('click', function() {
     document.getElementById('loadingStudents').style.display = 'block';
     document.getElementById('studentList').style.display = 'none';
 
-    fetch(`/teachers/get-students/${classId}/?subject_id=${subjectId}&term=${term}`)
-        .then(response => response.json())
+    // Rows arrive as columns/rows (or a delta); RosterCache turns them back into objects
+    RosterCache.load(`/teachers/get-students/${classId}/?subject_id=${subjectId}&term=${term}`)
         .then(students => {
              document.getElementById('loadingStudents').style.display = 'none';
              if(students.length === 0) {